@@ -1,35 +1,35 @@
 """RLBotChoreography
 
 Usage:
-    ChoreographyHive [--bot-folder=<folder>]
+    ChoreographyHive [--bot-folder=<folder>] [--profile] [--profile-dump=<file>] [--scheduler=<mode>]
+                     [--record=<file>] [--process] [--hot-reload]
     ChoreographyHive (-h | --help)
 
 Options:
     -h --help               Shows this help message.
     --bot-folder=<folder>   Searches this folder for bot configs to use for names and appearances [default: .].
+    --profile               Times every phase of every tick and logs a summary every few seconds.
+    --profile-dump=<file>   Where the profiler writes its summary, to diff between runs [default: tick_profile.json].
+    --scheduler=<mode>      How to wait for packets: poll, adaptive or fresh [default: adaptive].
+    --record=<file>         Records every tick of the show to this file. Restarting the Hivemind starts it over.
+    --process               Runs the Hivemind in its own process, with the fleet arrays in shared memory.
+    --hot-reload            Swaps in the running choreography's new code whenever its file is saved.
 """
-import glob
-import inspect
 import os
-import sys
-from importlib import reload, import_module
-from os.path import dirname, basename, isfile, join
+from importlib import reload
 from queue import Queue
 from threading import Thread
 
 from docopt import docopt
-from rlbot.matchconfig.conversions import parse_match_config
-from rlbot.matchconfig.match_config import PlayerConfig
-from rlbot.parsing.agent_config_parser import load_bot_appearance
-from rlbot.parsing.directory_scanner import scan_directory_for_bot_configs
-from rlbot.parsing.rlbot_config_parser import create_bot_config_layout
-from rlbot.setup_manager import SetupManager
 from rlbot.utils.structures.start_match_structures import MAX_PLAYERS
 
-import hivemind
-from choreography.choreography import Choreography
+from bot_folder import BotFolderScan, scan_bot_folder
+from choreo_index import ChoreoIndex
 from queue_commands import QCommand
 
+# The match setup, the hivemind and the choreographies are imported once they are needed, so the GUI shows
+# up straight away. Check what startup imports with `python -m benchmarks.startup_benchmark`.
+
 
 # TODO:
 # - Do bot-folder from inside the GUI
@@ -37,6 +37,13 @@ from queue_commands import QCommand
 class RLBotChoreography:
 
     def __init__(self):
+        self.arguments = docopt(__doc__)
+
+        # Finds the bots for names and appearances while the GUI starts. Later match setups scan again.
+        self.bot_folder = BotFolderScan(self.arguments['--bot-folder'])
+        # Parsed loadouts and appearance overrides, kept between match setups.
+        self.loadout_cache = None
+
         # Runs GUI and Hivemind on two different threads.
         q = Queue()
         thread1 = Thread(target=self.run_gui, args=(q, ))
@@ -47,11 +54,21 @@ class RLBotChoreography:
 
 
     def setup_match(self):
-        # TODO This should be replaced?
-        arguments = docopt(__doc__)
-
-        bot_directory = arguments['--bot-folder']
-        bundles = scan_directory_for_bot_configs(bot_directory)
+        from rlbot.matchconfig.conversions import parse_match_config
+        from rlbot.matchconfig.match_config import PlayerConfig
+        from rlbot.parsing.rlbot_config_parser import create_bot_config_layout
+        from rlbot.setup_manager import SetupManager
+        from loadouts import LoadoutCache
+
+        if self.bot_folder is not None:
+            # The scan started with the GUI.
+            bots = self.bot_folder.result()
+            self.bot_folder = None
+        else:
+            # Scans again to pick up bots added or removed since, which is quick if nothing changed.
+            bots = scan_bot_folder(self.arguments['--bot-folder'])
+        if self.loadout_cache is None:
+            self.loadout_cache = LoadoutCache()
 
         # Set up RLBot.cfg
         framework_config = create_bot_config_layout()
@@ -59,23 +76,32 @@ class RLBotChoreography:
         framework_config.parse_file(config_location, max_index=MAX_PLAYERS)
         match_config = parse_match_config(framework_config, config_location, {}, {})
 
-        looks_configs = {idx: bundle.get_looks_config() for idx, bundle in enumerate(bundles)}
-        names = [bundle.name for bundle in bundles]
-
+        names = [bot.name for bot in bots]
         player_config = match_config.player_configs[0]
+        num_players = max(len(bots), self.min_bots)
+
+        # Drones without a bot of their own keep the default appearance, unless the choreography overrides it.
+        # To get a certain visual effect, e.g. with specific boost colors, override get_appearance_overrides.
+        overrides = self.loadout_cache.appearance_table(self.choreo_obj, num_players)
+        looks_paths = [bot.looks_path for bot in bots]
+        # A participant which isn't a bot, e.g. a human, has no config to take the looks from.
+        has_looks = player_config.config_path is not None
+        for i in range(len(bots), num_players):
+            looks_paths.append(self.loadout_cache.looks_path(player_config.config_path)
+                               if has_looks and i in overrides else None)
+        loadouts = self.loadout_cache.appearances(self.choreo_obj, looks_paths)
+
         match_config.player_configs.clear()
-        for i in range(max(len(bundles), self.min_bots)):
+        for i in range(num_players):
             copied = PlayerConfig()
             copied.bot = player_config.bot
             copied.name = player_config.name
             copied.rlbot_controlled = player_config.rlbot_controlled
             copied.config_path = player_config.config_path
             copied.team = player_config.team
-            if i < len(bundles):
+            if i < len(bots):
                 copied.name = names[i]
-                # If you want to override bot appearances to get a certain visual effect, e.g. with
-                # specific boost colors, this is a good place to do it.
-                copied.loadout_config = load_bot_appearance(looks_configs[i], 0)
+            copied.loadout_config = loadouts[i]
             match_config.player_configs.append(copied)
 
         manager = SetupManager()
@@ -83,24 +109,33 @@ class RLBotChoreography:
         manager.connect_to_game()
         manager.start_match()
 
-
     def run_RLBotChoreography(self, queue):
         """
         If Hivemind breaks out of game_loop it is reloaded and recreated.
         """
+        import hivemind
+        from hive_process import HiveProcess, SharedFleetMemory, hivemind_options
+
         # Waits until a START command is received.
         while queue.get() != QCommand.START:
             continue
 
         self.setup_match()
 
+        # The fleet arrays are shared with the hivemind process, so other processes can watch them.
+        memory = SharedFleetMemory() if self.arguments['--process'] else None
+
         while True:
-            my_hivemind = hivemind.Hivemind(queue, self.choreo_obj)
-            my_hivemind.start() # Loop only quits on STOP command.
+            if memory is not None:
+                # A new process loads the latest code, so there is nothing to reload.
+                HiveProcess(self.choreo_obj, self.arguments, memory).forward(queue)
+            else:
+                my_hivemind = hivemind.Hivemind(queue, self.choreo_obj, **hivemind_options(self.arguments))
+                my_hivemind.start() # Loop only quits on STOP command.
 
-            # Reloads hivemind for new changes to take place.
-            # reload(sys.modules[self.choreo_obj.__module__])
-            reload(hivemind)
+                # Reloads hivemind for new changes to take place.
+                # reload(sys.modules[self.choreo_obj.__module__])
+                reload(hivemind)
 
             # Checks what to do after Hivemind died.
             command = queue.get()
@@ -109,6 +144,10 @@ class RLBotChoreography:
             elif command == QCommand.EXIT:
                 break
 
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+
         exit() # Clean exit.
 
 
@@ -117,39 +156,6 @@ class RLBotChoreography:
         Runs the simple gui.
         """
 
-        def reload_choreographies():
-            """
-            Finds and reloads all choreo modules and puts the found choreographies inside a dictionary.
-            """
-            # Automatically finds all choreo modules.
-            modules = glob.glob(join(dirname(__file__), "choreography/choreos/*.py"))
-            choreo_modules = [basename(f)[:-3] for f in modules if isfile(f) and not f.endswith('__init__.py')]
-
-            choreographies = {}
-            for choreo in choreo_modules:
-                module = f'choreography.choreos.{choreo}'
-
-                # Try reloading the module.
-                try:
-                    reload(sys.modules[module])
-                    classes = inspect.getmembers(sys.modules[module], inspect.isclass)
-
-                # If not loaded yet, import it.
-                except:
-                    print(f'Module not found, importing {module}')
-                    import_module(module)
-                    classes = inspect.getmembers(sys.modules[module], inspect.isclass)
-
-                # Find all the choreography classes inside.
-                finally:
-                    for name, obj in classes:
-                        # Checks whether the class subclasses Choreography.
-                        if issubclass(obj, Choreography) and obj is not Choreography:
-                            # FIXME Watch out for name conflicts!
-                            choreographies[name] = obj
-
-            return choreographies
-
         def start():
             num_bots_changed()
             print("[RLBotChoreography]: Starting up!")
@@ -181,16 +187,29 @@ class RLBotChoreography:
 
         def choreo_selected(var):
             """
-            Updates the selected choreography.
+            Updates the selected choreography. Its module is only imported again if it changed.
             """
-            self.choreographies = reload_choreographies()
-            self.choreo_obj = self.choreographies[var]
+            if var not in self.choreographies:
+                print(f"[RLBotChoreography]: {var} is gone, keeping {self.choreo_obj.__name__}.")
+                return
+            self.choreo_obj = choreo_index.load(var)
             num_bots_changed()
 
+        def refresh_choreographies():
+            """
+            Lists the choreographies again, to pick up added, removed and renamed ones. Only changed files are parsed.
+            """
+            self.choreographies = choreo_index.refresh()
+            menu = dropMenu['menu']
+            menu.delete(0, 'end')
+            for key in self.choreographies:
+                menu.add_command(label=key, command=tk._setit(menuvar, key, choreo_selected))
+
         def reload_hive():
             num_bots_changed()
             print("[RLBotChoreography]: Stopping Hivemind.")
             queue.put(QCommand.STOP)
+            refresh_choreographies()
             choreo_selected(menuvar.get())
             print("[RLBotChoreography]: Reloading Hivemind.")
             queue.put(QCommand.HIVE)
@@ -199,6 +218,7 @@ class RLBotChoreography:
             num_bots_changed()
             print("[RLBotChoreography]: Stopping Hivemind.")
             queue.put(QCommand.STOP)
+            refresh_choreographies()
             choreo_selected(menuvar.get())
             print("[RLBotChoreography]: Reloading all.")
             queue.put(QCommand.ALL)
@@ -214,11 +234,14 @@ class RLBotChoreography:
         button_start = tk.Button(frame, text="Start", command=start)
         button_start.pack()
 
-        # Dropdown menu.
-        self.choreographies = reload_choreographies()
+        # Dropdown menu. Choreographies are found without importing them.
+        choreo_index = ChoreoIndex()
+        self.choreographies = choreo_index.refresh()
         menuvar = tk.StringVar(root)
         menuvar.set('LightfallChoreography') # Set the default option
         dropMenu = tk.OptionMenu(frame, menuvar, *self.choreographies, command=choreo_selected)
+        # Lists them again whenever the menu is opened.
+        dropMenu['menu'].configure(postcommand=refresh_choreographies)
         dropMenu.pack()
 
         # Label for the entry box.
@@ -231,7 +254,8 @@ class RLBotChoreography:
         entry_num_bots.pack()
 
         # This is here just to make sure everything is set up by default.
-        choreo_selected(menuvar.get())
+        # Waits until the window is shown, since it imports the choreography.
+        root.after_idle(choreo_selected, menuvar.get())
 
         root.mainloop()
 
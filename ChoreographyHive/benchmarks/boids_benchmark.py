@@ -0,0 +1,66 @@
+"""Boids benchmark
+
+Times one Boids tick against the number of drones. Run it from the ChoreographyHive folder with
+`python -m benchmarks.boids_benchmark`.
+
+Usage:
+    boids_benchmark [--ticks=<ticks>]
+    boids_benchmark (-h | --help)
+
+Options:
+    -h --help           Shows this help message.
+    --ticks=<ticks>     Number of ticks to time for every drone count [default: 200].
+"""
+import time
+
+import numpy as np
+from docopt import docopt
+
+from choreography.choreos.boids import Boids
+from choreography.drone import Drone, DroneFleet, orient_matrices
+
+DRONE_COUNTS = [8, 16, 32, 48, 64, 128, 256]
+
+
+def make_flock(num_drones: int, seed: int = 0):
+    """
+    Creates a fleet of drones scattered over the field with random headings and velocities.
+    """
+    rng = np.random.default_rng(seed)
+    fleet = DroneFleet(num_drones)
+    fleet.pos[:, 0] = rng.uniform(-4000, 4000, num_drones)
+    fleet.pos[:, 1] = rng.uniform(-5000, 5000, num_drones)
+    fleet.pos[:, 2] = 17
+    fleet.vel[:, :2] = rng.uniform(-1000, 1000, (num_drones, 2))
+    fleet.rot[:, 1] = rng.uniform(-np.pi, np.pi, num_drones)
+    orient_matrices(fleet.rot, out=fleet.orient)
+    drones = [Drone(index, 0, fleet) for index in range(num_drones)]
+    return fleet, drones
+
+
+def time_boids(num_drones: int, ticks: int) -> np.ndarray:
+    """
+    Returns the duration of every tick in seconds.
+    """
+    fleet, drones = make_flock(num_drones)
+    boids = Boids(None)
+    durations = np.zeros(ticks)
+    for tick in range(ticks):
+        start = time.perf_counter()
+        boids.drones_are_boids(None, drones, 0.0)
+        durations[tick] = time.perf_counter() - start
+    return durations
+
+
+def main():
+    arguments = docopt(__doc__)
+    ticks = int(arguments['--ticks'])
+
+    print(f'{"drones":>8} {"mean ms":>10} {"p95 ms":>10} {"max ms":>10}')
+    for num_drones in DRONE_COUNTS:
+        durations = time_boids(num_drones, ticks) * 1000
+        print(f'{num_drones:>8} {durations.mean():>10.3f} {np.percentile(durations, 95):>10.3f} {durations.max():>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
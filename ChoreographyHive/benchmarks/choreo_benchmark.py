@@ -0,0 +1,183 @@
+"""Choreography benchmark
+
+Runs choreographies in a Hivemind against the SimGameInterface for a range of drone counts and tick rates, and
+records how long Choreography.step takes per tick, how much memory a tick allocates and the peak RSS.
+Every combination runs in a fresh process, so its peak RSS isn't that of an earlier, bigger one.
+Run it from the ChoreographyHive folder with `python -m benchmarks.choreo_benchmark`.
+
+Usage:
+    choreo_benchmark [<choreography>...] [--drones=<counts>] [--tick-rates=<rates>] [--ticks=<ticks>]
+                     [--output=<file>]
+    choreo_benchmark --compare <baseline> <current> [--threshold=<ratio>]
+    choreo_benchmark (-h | --help)
+
+Options:
+    -h --help               Shows this help message.
+    --drones=<counts>       Comma separated drone counts [default: 8,16,32,64].
+    --tick-rates=<rates>    Comma separated tick rates [default: 60,120].
+    --ticks=<ticks>         Number of ticks to time for every combination [default: 600].
+    --output=<file>         Where to write the results [default: choreo_benchmark.json].
+    --compare               Compares two result files and lists the regressions.
+    --threshold=<ratio>     How much slower or hungrier counts as a regression [default: 0.15].
+"""
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+from queue import Queue
+from typing import List
+
+import numpy as np
+from docopt import docopt
+from rlbot.utils.structures.game_data_struct import GameTickPacket
+
+from hivemind import Hivemind
+from sim.headless import find_choreography
+from sim.sim_game_interface import SimGameInterface
+from tick_profiler import TickProfiler
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is left out there.
+    resource = None
+
+CHOREOGRAPHIES = ['Boids', 'CrossingSquares', 'LettersChoreography', 'LightfallChoreography']
+# Ticks run before measuring, so one-off setup doesn't count.
+WARMUP_TICKS = 10
+# Ticks run again with tracemalloc on, which is too slow to leave on while timing.
+ALLOCATION_TICKS = 60
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_ticks(hivemind: Hivemind, game_interface: SimGameInterface, packet: GameTickPacket, ticks: int,
+              measure_allocations: bool = False) -> np.ndarray:
+    """Runs ticks, returns the bytes allocated during each one if measuring allocations."""
+    allocated = np.zeros(ticks)
+    for tick in range(ticks):
+        game_interface.update_live_data_packet(packet)
+        if measure_allocations:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        hivemind.tick(packet)
+        if measure_allocations:
+            _, peak = tracemalloc.get_traced_memory()
+            allocated[tick] = peak - before
+    return allocated
+
+
+def benchmark(name: str, num_drones: int, tick_rate: float, ticks: int) -> dict:
+    choreo_obj = find_choreography(name)
+    game_interface = SimGameInterface(num_drones, tick_rate)
+    profiler = TickProfiler(capacity=ticks, log_interval=float('inf'), tick_rate=tick_rate)
+    hivemind = Hivemind(Queue(), choreo_obj, game_interface)
+    game_interface.load_interface()
+    packet = GameTickPacket()
+
+    run_ticks(hivemind, game_interface, packet, WARMUP_TICKS)
+    hivemind.profiler = profiler
+    start = time.perf_counter()
+    run_ticks(hivemind, game_interface, packet, ticks)
+    duration = time.perf_counter() - start
+    hivemind.profiler = None
+
+    tracemalloc.start()
+    allocated = run_ticks(hivemind, game_interface, packet, ALLOCATION_TICKS, measure_allocations=True)
+    tracemalloc.stop()
+
+    return {
+        'choreography': name,
+        'drones': num_drones,
+        'tick_rate': tick_rate,
+        'ticks_per_second': round(ticks / duration, 1),
+        'step_ms': profiler.phases['choreo'].stats(),
+        'tick_ms': profiler.phases['total'].stats(),
+        'allocated_bytes_per_tick': {'mean': round(float(allocated.mean())), 'max': int(allocated.max())},
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def run(names: List[str], drone_counts: List[int], tick_rates: List[float], ticks: int) -> dict:
+    results = []
+    print(f'{"choreography":<24} {"drones":>6} {"rate":>5} {"step p50":>9} {"step p95":>9} {"alloc/tick":>11}')
+    # One process per task, so ru_maxrss only covers that combination.
+    pool = multiprocessing.get_context('spawn').Pool(processes=1, maxtasksperchild=1)
+    with pool:
+        for name in names:
+            for num_drones in drone_counts:
+                for tick_rate in tick_rates:
+                    result = pool.apply(benchmark, (name, num_drones, tick_rate, ticks))
+                    results.append(result)
+                    print(f'{name:<24} {num_drones:>6} {tick_rate:>5.0f} {result["step_ms"]["p50"]:>7.3f}ms '
+                          f'{result["step_ms"]["p95"]:>7.3f}ms {result["allocated_bytes_per_tick"]["mean"]:>10}B')
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'ticks': ticks,
+        'results': results
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """
+    Returns a line for every combination where the median step time, p95 step time or mean allocation
+    grew by more than threshold.
+    """
+    def key(result):
+        return result['choreography'], result['drones'], result['tick_rate']
+
+    before = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = before.get(key(result))
+        if old is None:
+            continue
+        metrics = [
+            ('step p50', old['step_ms']['p50'], result['step_ms']['p50']),
+            ('step p95', old['step_ms']['p95'], result['step_ms']['p95']),
+            ('alloc/tick', old['allocated_bytes_per_tick']['mean'], result['allocated_bytes_per_tick']['mean'])
+        ]
+        for metric, old_value, new_value in metrics:
+            if old_value > 0 and new_value > old_value * (1 + threshold):
+                name, drones, tick_rate = key(result)
+                regressions.append(f'{name} with {drones} drones at {tick_rate:.0f}Hz: {metric} '
+                                   f'{old_value} -> {new_value} (+{(new_value / old_value - 1) * 100:.0f}%)')
+    return regressions
+
+
+def main():
+    arguments = docopt(__doc__)
+
+    if arguments['--compare']:
+        with open(arguments['<baseline>']) as file:
+            baseline = json.load(file)
+        with open(arguments['<current>']) as file:
+            current = json.load(file)
+        regressions = compare(baseline, current, float(arguments['--threshold']))
+        for line in regressions:
+            print(line)
+        print(f'{len(regressions)} regressions.')
+        sys.exit(1 if regressions else 0)
+
+    names = arguments['<choreography>'] or CHOREOGRAPHIES
+    drone_counts = [int(count) for count in arguments['--drones'].split(',')]
+    tick_rates = [float(rate) for rate in arguments['--tick-rates'].split(',')]
+    report = run(names, drone_counts, tick_rates, int(arguments['--ticks']))
+
+    with open(arguments['--output'], 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'Results written to {arguments["--output"]}.')
+
+
+if __name__ == '__main__':
+    main()
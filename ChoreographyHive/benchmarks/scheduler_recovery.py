@@ -0,0 +1,87 @@
+"""Scheduler recovery check
+
+Feeds a TickScheduler packets in real time from a fake game which pauses for a while, and checks that it
+picks up the full tick rate again afterwards instead of stuttering. Run it from the ChoreographyHive folder
+with `python -m benchmarks.scheduler_recovery`. Exits with 1 if any mode doesn't recover.
+
+Usage:
+    scheduler_recovery [--pauses=<seconds>] [--tick-rate=<rate>] [--after=<seconds>]
+    scheduler_recovery (-h | --help)
+
+Options:
+    -h --help               Shows this help message.
+    --pauses=<seconds>      Comma separated pause lengths to try [default: 0.1,5].
+    --tick-rate=<rate>      Packets per second while not paused [default: 120].
+    --after=<seconds>       How long to count packets after the pause [default: 2].
+"""
+import sys
+import time
+
+from docopt import docopt
+from rlbot.utils.structures.game_data_struct import GameTickPacket
+
+from tick_scheduler import TickScheduler
+
+# Ticks run before the pause, so the scheduler has an estimate of the interval.
+WARMUP_SECONDS = 1.0
+# Share of the expected packets that has to be handled after the pause.
+REQUIRED_SHARE = 0.9
+
+
+class PausingInterface:
+    """A fake game interface with a new packet every 1 / tick_rate seconds, except while paused."""
+
+    def __init__(self, tick_rate: float, pause_start: float, pause_length: float):
+        self.dt = 1.0 / tick_rate
+        self.start = time.perf_counter()
+        self.pause_start = pause_start
+        self.pause_length = pause_length
+
+    def update_live_data_packet(self, packet: GameTickPacket):
+        elapsed = time.perf_counter() - self.start
+        if elapsed > self.pause_start:
+            # No new packets during the pause, and the game clock doesn't move.
+            elapsed = max(self.pause_start, elapsed - self.pause_length)
+        packet.game_info.seconds_elapsed = int(elapsed / self.dt) * self.dt
+
+
+def check(mode: str, tick_rate: float, pause: float, after: float) -> dict:
+    interface = PausingInterface(tick_rate, WARMUP_SECONDS, pause)
+    scheduler = TickScheduler(interface, mode, log_interval=float('inf'))
+    packet = GameTickPacket()
+    resumed = interface.start + WARMUP_SECONDS + pause
+
+    handled = 0
+    while time.perf_counter() < resumed + after:
+        if scheduler.next_packet(packet):
+            scheduler.inputs_sent()
+            if time.perf_counter() >= resumed:
+                handled += 1
+
+    expected = after * tick_rate
+    return {
+        'handled': handled,
+        'expected': round(expected),
+        'interval_ms': scheduler.interval * 1000,
+        'recovered': handled >= REQUIRED_SHARE * expected
+    }
+
+
+def main():
+    arguments = docopt(__doc__)
+    tick_rate = float(arguments['--tick-rate'])
+    after = float(arguments['--after'])
+
+    failed = False
+    print(f'{"mode":<9} {"pause":>6} {"packets":>11} {"interval":>10}')
+    for pause in [float(pause) for pause in arguments['--pauses'].split(',')]:
+        for mode in ('adaptive', 'poll'):
+            result = check(mode, tick_rate, pause, after)
+            failed |= not result['recovered']
+            print(f'{mode:<9} {pause:>5.1f}s {result["handled"]:>5}/{result["expected"]:<5} '
+                  f'{result["interval_ms"]:>8.2f}ms{"" if result["recovered"] else "  did not recover"}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
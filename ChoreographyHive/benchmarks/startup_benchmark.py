@@ -0,0 +1,69 @@
+"""Startup benchmark
+
+Imports the GUI entry point the way `python ChoreographyHive` does, without starting it, in fresh interpreters
+with `-X importtime`, and lists what the import time goes to, per top level module. Run it from the
+ChoreographyHive folder with `python -m benchmarks.startup_benchmark`.
+
+Usage:
+    startup_benchmark [--runs=<runs>] [--top=<count>] [--budget=<ms>]
+    startup_benchmark (-h | --help)
+
+Options:
+    -h --help           Shows this help message.
+    --runs=<runs>       Number of cold starts to take the median of [default: 5].
+    --top=<count>       Number of modules to list [default: 15].
+    --budget=<ms>       Exits with 1 if the median import time is more than this many milliseconds.
+"""
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import numpy as np
+from docopt import docopt
+
+ENTRY_POINT = os.path.join(os.path.dirname(os.path.dirname(__file__)), '__main__.py')
+# Runs the module under another name, so the GUI doesn't start.
+IMPORT_ENTRY_POINT = f'import runpy; runpy.run_path({ENTRY_POINT!r}, run_name="startup_benchmark")'
+
+
+def import_times() -> Dict[str, float]:
+    """
+    Imports the entry point in a new interpreter. Returns the cumulative import time in milliseconds
+    of every module it imports directly or through the standard startup, e.g. site.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_ENTRY_POINT],
+                            cwd=os.path.dirname(ENTRY_POINT), capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented, they are already counted in the cumulative time of the top level one.
+        if not cumulative.strip().isdigit() or name.startswith('  '):
+            continue
+        times[name.strip()] = times.get(name.strip(), 0.0) + int(cumulative) / 1000
+    return times
+
+
+def main():
+    arguments = docopt(__doc__)
+    runs = [import_times() for _ in range(int(arguments['--runs']))]
+
+    names = set().union(*runs)
+    medians = {name: float(np.median([run.get(name, 0.0) for run in runs])) for name in names}
+    total = float(np.median([sum(run.values()) for run in runs]))
+
+    print(f'{"module":<48} {"ms":>8} {"share":>6}')
+    for name, duration in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:int(arguments['--top'])]:
+        print(f'{name:<48} {duration:>8.1f} {duration / total * 100:>5.0f}%')
+    print(f'{"total":<48} {total:>8.1f}')
+
+    budget = arguments['--budget']
+    if budget is not None and total > float(budget):
+        print(f'Startup imports take {total:.1f}ms, over the budget of {budget}ms.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from rlbot.utils.logging_utils import get_logger
+
+# Remembers what the last scan of each bot folder found, so an unchanged folder isn't parsed again.
+CACHE_FILE = os.path.join(os.path.dirname(__file__), '.bot_folder_cache.json')
+CACHE_VERSION = 1
+
+
+@dataclass
+class BotLooks:
+    name: str
+    config_path: str
+    looks_path: str
+
+
+def folder_mtimes(directory: str) -> Dict[str, float]:
+    """
+    The mtimes of every folder and .cfg file below directory. Adding, removing, renaming or editing
+    a config changes at least one of them.
+    """
+    mtimes = {}
+    for folder, _, files in os.walk(directory):
+        mtimes[folder] = os.stat(folder).st_mtime
+        for file in files:
+            if file.endswith('.cfg'):
+                path = os.path.join(folder, file)
+                mtimes[path] = os.stat(path).st_mtime
+    return mtimes
+
+
+def scan_bot_folder(directory: str) -> List[BotLooks]:
+    """
+    Finds the bot configs in directory, like rlbot's scan_directory_for_bot_configs, sorted by config path.
+    Uses the result of the previous scan if no folder or config changed since, and looks files
+    which are kept outside the folder are unchanged too.
+    """
+    directory = os.path.abspath(directory)
+    mtimes = folder_mtimes(directory)
+
+    cache = load_cache()
+    cached = cache.get(directory)
+    if cached is not None and cached['mtimes'] == mtimes and all(
+            os.path.isfile(path) and os.stat(path).st_mtime == mtime for path, mtime in cached['looks'].items()):
+        return [BotLooks(*bot) for bot in cached['bots']]
+
+    from rlbot.parsing.directory_scanner import scan_directory_for_bot_configs
+    bundles = sorted(scan_directory_for_bot_configs(directory), key=lambda bundle: bundle.config_path)
+    bots = [BotLooks(bundle.name, bundle.config_path, bundle.looks_path) for bundle in bundles]
+
+    cache[directory] = {
+        'mtimes': mtimes,
+        'looks': {bot.looks_path: os.stat(bot.looks_path).st_mtime for bot in bots},
+        'bots': [[bot.name, bot.config_path, bot.looks_path] for bot in bots]
+    }
+    save_cache(cache)
+    return bots
+
+
+def load_cache() -> dict:
+    try:
+        with open(CACHE_FILE) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('folders', {}) if cache.get('version') == CACHE_VERSION else {}
+
+
+def save_cache(folders: dict):
+    # Written next to the cache and renamed over it, so a crash never leaves half a file behind.
+    temporary = f'{CACHE_FILE}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump({'version': CACHE_VERSION, 'folders': folders}, file)
+    os.replace(temporary, CACHE_FILE)
+
+
+class BotFolderScan:
+    """
+    Scans the bot folder on a background thread while the GUI starts up. result() waits for it to finish.
+    """
+
+    def __init__(self, directory: str):
+        self.logger = get_logger('Bot Folder')
+        self.directory = directory
+        self.bots: Optional[List[BotLooks]] = None
+        self.error: Optional[Exception] = None
+        self.thread = threading.Thread(target=self.scan, name='Bot Folder Scan', daemon=True)
+        self.thread.start()
+
+    def scan(self):
+        try:
+            self.bots = scan_bot_folder(self.directory)
+            self.logger.info(f'Found {len(self.bots)} bots in {self.directory}.')
+        except Exception as error:
+            self.error = error
+
+    def result(self) -> List[BotLooks]:
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.bots
@@ -0,0 +1,129 @@
+import ast
+import glob
+import os
+import sys
+from dataclasses import dataclass
+from importlib import import_module, reload
+from typing import Dict, List, Set, Tuple
+
+from rlbot.utils.logging_utils import get_logger
+
+CHOREOGRAPHY_DIRECTORY = os.path.join(os.path.dirname(__file__), 'choreography')
+CHOREOS_DIRECTORY = os.path.join(CHOREOGRAPHY_DIRECTORY, 'choreos')
+
+
+@dataclass
+class ChoreoEntry:
+    key: str  # Unique name to select it by.
+    name: str  # Name of the class.
+    module: str
+    path: str
+
+
+def class_bases(path: str) -> Dict[str, List[str]]:
+    """
+    Parses a module without importing it. Returns the classes defined at its top level, with the names of
+    their bases, e.g. {'ReplayRecording': ['ReplayChoreography']} for class ReplayRecording(replay.ReplayChoreography).
+    """
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read(), path)
+
+    classes = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            bases = []
+            for base in node.bases:
+                if isinstance(base, ast.Name):
+                    bases.append(base.id)
+                elif isinstance(base, ast.Attribute):
+                    bases.append(base.attr)
+            classes[node.name] = bases
+    return classes
+
+
+class ChoreoIndex:
+    """
+    Finds the Choreography subclasses in choreography/choreos by reading the source, so nothing is imported until a
+    choreography is picked with load(). Files are only parsed again, and modules only re-imported, once they changed.
+
+    Bases are matched by name, so a class counts as a choreography if it derives from Choreography, or from another
+    class deriving from it in the choreography package. If two modules define a choreography with the same name,
+    both are listed as module.Name instead.
+    """
+
+    def __init__(self):
+        self.logger = get_logger('Choreo Index')
+        # Path -> (mtime, classes defined there with the names of their bases).
+        self.scanned: Dict[str, Tuple[float, Dict[str, List[str]]]] = {}
+        # Module -> mtime of the file when it was last imported.
+        self.imported: Dict[str, float] = {}
+        self.entries: Dict[str, ChoreoEntry] = {}
+
+    def refresh(self) -> Dict[str, ChoreoEntry]:
+        """Parses new and changed files and returns the choreographies by key."""
+        paths = glob.glob(os.path.join(CHOREOGRAPHY_DIRECTORY, '*.py')) + \
+                glob.glob(os.path.join(CHOREOS_DIRECTORY, '*.py'))
+        scanned = {}
+        for path in paths:
+            mtime = os.stat(path).st_mtime
+            previous = self.scanned.get(path)
+            if previous is not None and previous[0] == mtime:
+                scanned[path] = previous
+                continue
+            try:
+                scanned[path] = (mtime, class_bases(path))
+            except SyntaxError as error:
+                self.logger.warning(f'Skipping {path}, it does not parse: {error}')
+        self.scanned = scanned
+
+        choreo_names = self.choreography_names()
+        found: Dict[str, List[ChoreoEntry]] = {}
+        for path, (_, classes) in sorted(scanned.items()):
+            if os.path.dirname(path) != CHOREOS_DIRECTORY:
+                continue
+            module = f'choreography.choreos.{os.path.splitext(os.path.basename(path))[0]}'
+            for name in classes:
+                if name in choreo_names:
+                    found.setdefault(name, []).append(ChoreoEntry(name, name, module, path))
+
+        self.entries = {}
+        for name, entries in found.items():
+            if len(entries) > 1:
+                self.logger.warning(f'{name} is defined in {", ".join(entry.module for entry in entries)}, '
+                                    f'listing them by module.')
+                for entry in entries:
+                    entry.key = f'{entry.module.rsplit(".", 1)[1]}.{name}'
+            for entry in entries:
+                self.entries[entry.key] = entry
+        return self.entries
+
+    def choreography_names(self) -> Set[str]:
+        """Names of all the classes which derive from Choreography, going through bases until nothing changes."""
+        bases = {}
+        for _, classes in self.scanned.values():
+            for name, names in classes.items():
+                bases.setdefault(name, set()).update(names)
+
+        choreo_names = {'Choreography'}
+        changed = True
+        while changed:
+            changed = False
+            for name, names in bases.items():
+                if name not in choreo_names and names & choreo_names:
+                    choreo_names.add(name)
+                    changed = True
+        choreo_names.discard('Choreography')
+        return choreo_names
+
+    def load(self, key: str):
+        """Returns the choreography class, importing its module first or again if its file changed since."""
+        entry = self.entries[key]
+        mtime = os.stat(entry.path).st_mtime
+        if entry.module not in sys.modules:
+            module = import_module(entry.module)
+        elif self.imported.get(entry.module) != mtime:
+            module = reload(sys.modules[entry.module])
+        else:
+            module = sys.modules[entry.module]
+        self.imported[entry.module] = mtime
+        return getattr(module, entry.name)
@@ -0,0 +1,85 @@
+import glob
+import os
+import sys
+import threading
+import traceback
+from importlib import reload
+from typing import Dict, Optional
+
+from rlbot.utils.logging_utils import get_logger
+
+CHOREOS_DIRECTORY = os.path.join(os.path.dirname(__file__), 'choreography', 'choreos')
+
+
+class ChoreoWatcher:
+    """
+    Watches the files in choreography/choreos for changes, without tearing down the hivemind.
+
+    A changed module is reloaded on a background thread. If it is the module of the running choreography,
+    the new version of the class waits in take() until the hivemind builds and swaps it in between two ticks.
+    It is only built there, since generating the sequence reads the drones and may state set.
+    If reloading fails, the error is logged and the running choreography carries on.
+    """
+
+    def __init__(self, choreo_class, interval: float = 0.25):
+        self.logger = get_logger('Choreo Watcher')
+        self.module_name = choreo_class.__module__
+        self.class_name = choreo_class.__name__
+        self.interval = interval
+
+        self.mtimes: Dict[str, float] = self.scan()
+        self.pending: Optional[type] = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name='Choreo Watcher', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def take(self) -> Optional[type]:
+        """Returns the reloaded choreography class if there is a new one, otherwise None. Call between ticks."""
+        if self.pending is None:
+            return None
+        with self.lock:
+            choreo_class, self.pending = self.pending, None
+        return choreo_class
+
+    @staticmethod
+    def scan() -> Dict[str, float]:
+        mtimes = {}
+        for path in glob.glob(os.path.join(CHOREOS_DIRECTORY, '*.py')):
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                pass  # Deleted since the glob.
+        return mtimes
+
+    def watch(self):
+        while not self.stopped.wait(self.interval):
+            mtimes = self.scan()
+            changed = [path for path, mtime in mtimes.items() if self.mtimes.get(path) != mtime]
+            self.mtimes = mtimes
+            for path in changed:
+                self.reload(f'choreography.choreos.{os.path.splitext(os.path.basename(path))[0]}')
+
+    def reload(self, module_name: str):
+        if module_name not in sys.modules:
+            return  # Never imported, so nothing is using it yet.
+        try:
+            module = reload(sys.modules[module_name])
+            if module_name != self.module_name:
+                self.logger.info(f'Reloaded {module_name}.')
+                return
+            choreo_class = getattr(module, self.class_name)
+        except Exception:
+            self.logger.error(f'Could not reload {module_name}, keeping the running choreography.\n'
+                              f'{traceback.format_exc()}')
+            return
+
+        with self.lock:
+            self.pending = choreo_class
+        self.logger.info(f'Reloaded {module_name}, swapping in the new {self.class_name}.')
@@ -1,8 +1,36 @@
-from typing import Set, List
+import time
+from typing import Set, List, Dict, Callable, Iterable, Optional
 
 from rlbot.utils.structures.game_data_struct import GameTickPacket
 
+from choreography.controls import reset_controls
 from choreography.drone import Drone
+from choreography.group_step import GroupStep
+
+
+class Track:
+    """
+    A named group of drones with its own list of steps. Each track moves on to its next step on its own,
+    so several groups can do different things at the same time. Steps keep their own start time,
+    so don't put the same step object in two tracks.
+    """
+
+    def __init__(self, name: str, drone_indices: Iterable[int], steps: List[GroupStep] = None):
+        self.name = name
+        self.drone_indices = list(drone_indices)
+        self.steps: List[GroupStep] = steps if steps is not None else []
+        self.step_index = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.step_index >= len(self.steps)
+
+    def current_step(self) -> Optional[GroupStep]:
+        return None if self.finished else self.steps[self.step_index]
+
+    def select(self, drones: List[Drone]) -> List[Drone]:
+        """Picks this track's drones out of the full drone list."""
+        return [drones[index] for index in self.drone_indices if index < len(drones)]
 
 
 class Choreography:
@@ -10,17 +38,54 @@ class Choreography:
     def __init__(self):
         self.sequence = []
         self.sequence_index = 0
+        self.tracks: Dict[str, Track] = {}
         self.finished = False
+        # Set by the hivemind when profiling, called with every step performed and how long it took.
+        self.record_step: Callable[[GroupStep, float], None] = None
+
+    def add_track(self, name: str, drones: Iterable[Drone], steps: List[GroupStep] = None) -> Track:
+        """
+        Adds a track which runs alongside the main sequence. The drones are remembered by index,
+        and the track's steps only get those drones.
+        """
+        track = Track(name, [drone.index for drone in drones], steps)
+        self.tracks[name] = track
+        return track
 
     def step(self, packet: GameTickPacket, drones: List[Drone]):
         self.pre_step(drones)
+        if self.sequence_index >= len(self.sequence) and all(track.finished for track in self.tracks.values()):
+            self.finished = True
+            return
+
         if self.sequence_index < len(self.sequence):
-            step = self.sequence[self.sequence_index]
-            result = step.perform(packet, drones)
-            if result.finished:
+            if self.perform(self.sequence[self.sequence_index], packet, drones):
                 self.sequence_index += 1
-        else:
-            self.finished = True
+
+        # All the tracks are stepped in the same tick, and share its state setting and input flush.
+        for track in self.tracks.values():
+            if not track.finished and self.perform(track.current_step(), packet, track.select(drones)):
+                track.step_index += 1
+
+    def perform(self, step: GroupStep, packet: GameTickPacket, drones: List[Drone]) -> bool:
+        """Performs one step and returns whether it finished."""
+        if self.record_step is None:
+            return step.perform(packet, drones).finished
+        start = time.perf_counter()
+        result = step.perform(packet, drones)
+        self.record_step(step, time.perf_counter() - start)
+        return result.finished
+
+    def current_step(self):
+        """Returns the step which the next call to step() will perform, or None if there is none left."""
+        if self.sequence_index < len(self.sequence):
+            return self.sequence[self.sequence_index]
+        return None
+
+    def active_steps(self) -> List[GroupStep]:
+        """Returns the steps which the next call to step() will perform, from the sequence and every track."""
+        steps = [] if self.current_step() is None else [self.current_step()]
+        return steps + [track.current_step() for track in self.tracks.values() if not track.finished]
 
     def generate_sequence(self, drones: List[Drone]):
         pass
@@ -29,6 +94,15 @@ class Choreography:
     def get_num_bots():
         raise NotImplementedError
 
+    @staticmethod
+    def get_appearance_overrides(num_bots: int) -> Dict[int, Dict[str, int]]:
+        """
+        Loadout fields to change per drone index at match setup, e.g. {0: {'boost_id': 32}}.
+        Paint goes through paint_config, e.g. {'paint_config.boost_paint_id': 1}.
+        Worked out once per number of bots, so it is not called again when restarting the match.
+        Appearances are only applied at match setup, so after a --hot-reload the old overrides stay until "↻ All".
+        """
+        return {}
+
     def pre_step(self, drones: List[Drone]):
-        for drone in drones:
-            drone.reset_ctrl()
+        reset_controls(drones)
@@ -1,13 +1,14 @@
 from typing import List
 
 import numpy as np
+from scipy.spatial import cKDTree
 
-from rlbot.agents.base_agent import SimpleControllerState
 from rlbot.utils.game_state_util import GameState, CarState, Physics, Vector3, Rotator, BallState
 from rlbot.utils.structures.game_interface import GameInterface
 
 from choreography.choreography import Choreography
-from choreography.drone import seek_pos, normalise, Drone
+from choreography.controls import reset_controls
+from choreography.drone import seek_pos_fleet, normalise, Drone, fleet_state
 from choreography.group_step import BlindBehaviorStep, DroneListStep, StepResult, PerDroneStep
 
 
@@ -71,65 +72,53 @@ class Boids(Choreography):
         SEPARATION_MUL = 200
         AVOID_WALL_MUL = 500
 
-        for drone in drones:
-            # Resetting drone controller.
-            drone.ctrl = SimpleControllerState()
-
-            # Creating "forces"
-            alignment_vec = np.zeros(3)
-            cohesion_vec = np.zeros(3)
-            separation_vec = np.zeros(3)
-            avoid_walls_vec = np.zeros(3)
-
-            others = 0 # The amount of drones in perception dist.
-            for other in drones:
-                # Skip if the other is also the drone.
-                if other is drone: continue
-
-                other_to_drone = drone.pos - other.pos
-                distance = np.linalg.norm(other_to_drone)
-
-                # Skip if other is too far.
-                if distance > PERCEPTION_DIS: continue
-
-                # Increment others.
-                others += 1
-
-                # Alignment
-                alignment_vec += other.vel
-                # Cohesion
-                cohesion_vec += other.pos
-                # Separation
-                separation_vec += other_to_drone / distance**2
-
-            # Avoid Walls.
-            if drone.pos[0] < -2800:
-                avoid_walls_vec += np.array([1,0,0])
-            elif drone.pos[0] > 2800:
-                avoid_walls_vec += np.array([-1,0,0])
-
-            if drone.pos[1] < -3800:
-                avoid_walls_vec += np.array([0,1,0])
-            elif drone.pos[1] > 3800:
-                avoid_walls_vec += np.array([0,-1,0])
-
-            # Averaging out cohesion_vec
-            # and making it relative to drone.
-            if others > 0: cohesion_vec / others
-            cohesion_vec -= drone.pos
-
-            # Create seek target.
-            target = np.zeros(3)
-            target += ALIGNMENT_MUL * normalise(alignment_vec)
-            target += COHESION_MUL * normalise(cohesion_vec)
-            target += SEPARATION_MUL * normalise(separation_vec)
-            target += AVOID_WALL_MUL * normalise(avoid_walls_vec)
-
-            target += drone.pos
-
-            # Follow target.
-            seek_pos(drone, target, max_speed=1000)
+        # Resetting drone controllers.
+        reset_controls(drones)
+
+        pos, vel, _ = fleet_state(drones)
+        num_drones = len(drones)
+
+        # Finds every pair of drones within perception distance of each other.
+        # Each pair is used twice, once from the point of view of each drone.
+        pairs = cKDTree(pos).query_pairs(PERCEPTION_DIS, output_type='ndarray')
+        me = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        other = np.concatenate((pairs[:, 1], pairs[:, 0]))
+
+        other_to_drone = pos[me] - pos[other]
+        distance_sq = np.sum(other_to_drone ** 2, axis=1)
+
+        # Creating "forces"
+        # Alignment
+        alignment_vec = sum_rows(me, vel[other], num_drones)
+        # Cohesion, made relative to drone.
+        cohesion_vec = sum_rows(me, pos[other], num_drones) - pos
+        # Separation
+        separation_vec = sum_rows(me, other_to_drone / distance_sq[:, np.newaxis], num_drones)
+
+        # Avoid Walls.
+        avoid_walls_vec = np.zeros((num_drones, 3))
+        avoid_walls_vec[:, 0] = np.select([pos[:, 0] < -2800, pos[:, 0] > 2800], [1, -1])
+        avoid_walls_vec[:, 1] = np.select([pos[:, 1] < -3800, pos[:, 1] > 3800], [1, -1])
+
+        # Create seek targets.
+        targets = ALIGNMENT_MUL * normalise(alignment_vec)
+        targets += COHESION_MUL * normalise(cohesion_vec)
+        targets += SEPARATION_MUL * normalise(separation_vec)
+        targets += AVOID_WALL_MUL * normalise(avoid_walls_vec)
+        targets += pos
+
+        # Follow targets.
+        seek_pos_fleet(drones, targets, max_speed=1000).apply(drones)
 
         # Never finishes.
         return StepResult(finished=False)
 
+
+def sum_rows(rows: np.ndarray, values: np.ndarray, num_rows: int) -> np.ndarray:
+    """
+    Sums values of shape (M, 3) into num_rows rows, where rows says which row each value belongs to.
+    """
+    result = np.empty((num_rows, 3))
+    for axis in range(3):
+        result[:, axis] = np.bincount(rows, weights=values[:, axis], minlength=num_rows)
+    return result
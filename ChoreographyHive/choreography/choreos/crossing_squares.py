@@ -101,7 +101,7 @@ class CrossingSquares(Choreography):
 
         for drone in drones:
             throttle_start = (drone.index % 16 // 4) * 0.9
-            drone.ctrl = SimpleControllerState()
+            drone.ctrl.reset()
 
             if throttle_start < elapsed:
                 # Speed controller.
@@ -121,7 +121,7 @@ class CrossingSquares(Choreography):
         buffer = 0.65
 
         for drone in drones:
-            drone.ctrl = SimpleControllerState()
+            drone.ctrl.reset()
 
             # Speed controller.
             vel = np.linalg.norm(drone.vel*np.array([1,1,0]))
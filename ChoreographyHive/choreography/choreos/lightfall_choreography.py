@@ -1,11 +1,13 @@
 import math
 
+import numpy as np
+
 from rlbot.agents.base_agent import SimpleControllerState
 from rlbot.utils.game_state_util import GameState, CarState, Physics, Vector3, Rotator, BallState
 from rlbot.utils.structures.game_interface import GameInterface
 
 from choreography.choreography import Choreography
-from choreography.drone import slow_to_pos
+from choreography.drone import slow_to_pos_fleet
 from choreography.group_step import BlindBehaviorStep, DroneListStep, StepResult, PerDroneStep
 
 
@@ -43,7 +45,8 @@ class LightfallChoreography(Choreography):
         elapsed = packet.game_info.seconds_elapsed - start_time
         jump_start = drone.index * 0.06
         jump_end = jump_start + .5
-        drone.ctrl = SimpleControllerState(jump=jump_start < elapsed < jump_end)
+        drone.ctrl.reset()
+        drone.ctrl.jump = jump_start < elapsed < jump_end
         wheel_contact = packet.game_cars[drone.index].has_wheel_contact
         return StepResult(finished=elapsed > jump_end and wheel_contact)
 
@@ -55,10 +58,11 @@ class LightfallChoreography(Choreography):
         radian_spacing = 2 * math.pi / len(drones)
         elapsed = packet.game_info.seconds_elapsed - start_time
         radius = 4000 - elapsed * 100
-        for i, drone in enumerate(drones):
-            progress = i * radian_spacing + elapsed * .5
-            target = [radius * math.sin(progress), radius * math.cos(progress), 0]
-            slow_to_pos(drone, target)
+        progress = np.arange(len(drones)) * radian_spacing + elapsed * .5
+        targets = np.zeros((len(drones), 3))
+        targets[:, 0] = radius * np.sin(progress)
+        targets[:, 1] = radius * np.cos(progress)
+        slow_to_pos_fleet(drones, targets).apply(drones)
         return StepResult(finished=radius < 10)
 
     def line_up(self, packet, drones, start_time) -> StepResult:
@@ -101,7 +105,11 @@ class LightfallChoreography(Choreography):
         Causes cars to boost and pitch until they land on their wheels. This is tuned to work well when
         place_near_ceiling has just been called.
         """
-        drone.ctrl = SimpleControllerState(boost=drone.vel[2] < -280, throttle=1, pitch=-0.15)
+        ctrl = drone.ctrl
+        ctrl.reset()
+        ctrl.boost = drone.vel[2] < -280
+        ctrl.throttle = 1
+        ctrl.pitch = -0.15
         wheel_contact = packet.game_cars[drone.index].has_wheel_contact
         return StepResult(finished=wheel_contact)
 
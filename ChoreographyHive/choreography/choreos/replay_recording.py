@@ -0,0 +1,9 @@
+from choreography import replay
+
+
+class ReplayRecording(replay.ReplayChoreography):
+    """
+    Replays recordings/recording.bin.
+    Record one from the ChoreographyHive folder with --record=recordings/recording.bin.
+    """
+    RECORDING = 'recording.bin'
@@ -0,0 +1,76 @@
+from typing import List
+
+import numpy as np
+
+# The controls of a SimpleControllerState, in the order they are stored in DroneFleet.controls.
+CONTROL_FIELDS = ('throttle', 'steer', 'pitch', 'yaw', 'roll', 'jump', 'boost', 'handbrake', 'use_item')
+BUTTON_FIELDS = ('jump', 'boost', 'handbrake', 'use_item')
+
+
+class DroneControls:
+    """
+    The controls of one drone, stored in its row of the fleet's controls array. It has the same attributes
+    as a SimpleControllerState, so choreographies can keep writing drone.ctrl.throttle = 1.0.
+
+    The rows are allocated once with the fleet. Assigning to drone.ctrl copies the values into the row
+    instead of replacing it, so nothing is allocated per tick and shared presets are never written to.
+    """
+
+    __slots__ = ('values',)
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def reset(self):
+        """Sets all controls to zero / released."""
+        self.values.fill(0.0)
+
+    def copy_from(self, controls):
+        """Copies the values of a SimpleControllerState, DroneControls, or array from frozen_controls."""
+        if isinstance(controls, np.ndarray):
+            self.values[:] = controls
+        elif isinstance(controls, DroneControls):
+            self.values[:] = controls.values
+        else:
+            for column, name in enumerate(CONTROL_FIELDS):
+                self.values[column] = getattr(controls, name)
+
+    def __repr__(self):
+        return f'DroneControls({", ".join(f"{name}={getattr(self, name)}" for name in CONTROL_FIELDS)})'
+
+
+def _control_property(column: int, button: bool) -> property:
+    def get(self):
+        value = self.values[column]
+        return bool(value) if button else float(value)
+
+    def set(self, value):
+        self.values[column] = value
+
+    return property(get, set)
+
+
+for _column, _name in enumerate(CONTROL_FIELDS):
+    setattr(DroneControls, _name, _control_property(_column, _name in BUTTON_FIELDS))
+
+
+def frozen_controls(controls) -> np.ndarray:
+    """
+    Turns a SimpleControllerState into a read-only row of control values, to share between drones
+    as a preset. Assigning it to drone.ctrl copies it, and writing to it raises an error.
+    """
+    values = np.array([float(getattr(controls, name)) for name in CONTROL_FIELDS])
+    values.flags.writeable = False
+    return values
+
+
+def reset_controls(drones: List['Drone']):
+    """Resets the controls of all the given drones, at once if they make up a whole fleet."""
+    if not drones:
+        return
+    fleet = drones[0].fleet
+    if len(drones) == fleet.size and all(drone.fleet is fleet for drone in drones):
+        fleet.controls.fill(0.0)
+    else:
+        for drone in drones:
+            drone.fleet.controls[drone.row].fill(0.0)
@@ -1,31 +1,159 @@
+import ctypes
+from typing import List, Tuple, Dict
+
 import numpy as np
-from rlbot.agents.base_agent import SimpleControllerState
 
-from rlbot.utils.structures.game_data_struct import Rotator, Vector3, PlayerInfo
+from rlbot.utils.structures.game_data_struct import Rotator, Vector3, PlayerInfo, Physics, GameTickPacket
+
+from choreography.controls import CONTROL_FIELDS, DroneControls
+
+
+class DroneFleet:
+    """
+    Holds the state of every drone in contiguous arrays, one row per car index.
+    The arrays are filled in place from the GameTickPacket, so no new arrays are created every tick.
+
+    The pos, rot, vel, boost and controls arrays can be passed in, e.g. views into shared memory.
+    They are zeroed and then used as they are.
+    """
+
+    SHAPES = {'pos': (3,), 'rot': (3,), 'vel': (3,), 'boost': (), 'controls': (len(CONTROL_FIELDS),)}
+
+    def __init__(self, size: int, arrays: Dict[str, np.ndarray] = None):
+        self.size: int = size
+        if arrays is None:
+            arrays = {name: np.zeros((size,) + shape) for name, shape in self.SHAPES.items()}
+        else:
+            for array in arrays.values():
+                array.fill(0.0)
+        self.pos: np.ndarray = arrays['pos']
+        self.rot: np.ndarray = arrays['rot']
+        self.vel: np.ndarray = arrays['vel']
+        self.boost: np.ndarray = arrays['boost']
+        self.orient: np.ndarray = np.tile(np.identity(3), (size, 1, 1))
+        self.controls: np.ndarray = arrays['controls']
+        # One controls object per row, writing straight into the controls array.
+        self.drone_controls: List[DroneControls] = [DroneControls(self.controls[row]) for row in range(size)]
+        self.time: float = 0.0
+        self._packet = None
+        self._cars = None
+
+    def update(self, packet: GameTickPacket):
+        cars = self._cars_view(packet)[:self.size]
+        np.copyto(self.pos, cars['location'])
+        np.copyto(self.rot, cars['rotation'])
+        np.copyto(self.vel, cars['velocity'])
+        np.copyto(self.boost, cars['boost'])
+        orient_matrices(self.rot, out=self.orient)
+        self.time = packet.game_info.seconds_elapsed
+
+    def update_row(self, row: int, game_car: PlayerInfo, time: float):
+        self.pos[row] = a3v(game_car.physics.location)
+        self.rot[row] = a3r(game_car.physics.rotation)
+        self.vel[row] = a3v(game_car.physics.velocity)
+        self.boost[row] = game_car.boost
+        orient_matrices(self.rot[row:row + 1], out=self.orient[row:row + 1])
+        self.time = time
+
+    def _cars_view(self, packet: GameTickPacket) -> np.ndarray:
+        """
+        Returns a structured numpy view over the packet's game_cars. The packet is updated
+        in place by the game interface, so the view is only rebuilt when the packet object changes.
+        """
+        if packet is not self._packet:
+            self._cars = np.frombuffer(packet.game_cars, dtype=CAR_DTYPE)
+            self._packet = packet
+        return self._cars
+
+
+# Layout of the fields we read from PlayerInfo, used to view game_cars without copying.
+CAR_DTYPE = np.dtype({
+    'names': ['location', 'rotation', 'velocity', 'boost'],
+    'formats': [('<f4', 3), ('<f4', 3), ('<f4', 3), '<i4'],
+    'offsets': [
+        PlayerInfo.physics.offset + Physics.location.offset,
+        PlayerInfo.physics.offset + Physics.rotation.offset,
+        PlayerInfo.physics.offset + Physics.velocity.offset,
+        PlayerInfo.boost.offset
+    ],
+    'itemsize': ctypes.sizeof(PlayerInfo)
+})
 
 
 class Drone:
-    def __init__(self, index: int, team: int):
+    """
+    A lightweight view into one row of a DroneFleet. Without a fleet the drone gets a fleet of its own.
+
+    Note that pos, rot, vel and orient_m are views which change in place when the fleet updates.
+    Copy them if you need to keep the old value around.
+    """
+
+    def __init__(self, index: int, team: int, fleet: DroneFleet = None):
         self.index: int = index
         self.team: int = team
-        self.pos: np.ndarray = np.zeros(3)
-        self.rot: np.ndarray = np.zeros(3)
-        self.vel: np.ndarray = np.zeros(3)
-        self.boost: float = 0.0
-        self.time: float = 0.0
-        self.orient_m: np.ndarray = np.identity(3)
-        self.ctrl: SimpleControllerState = SimpleControllerState()
+        if fleet is None:
+            self.fleet: DroneFleet = DroneFleet(1)
+            self.row: int = 0
+        else:
+            self.fleet: DroneFleet = fleet
+            self.row: int = index
+
+    @property
+    def ctrl(self) -> DroneControls:
+        return self.fleet.drone_controls[self.row]
+
+    @ctrl.setter
+    def ctrl(self, controls):
+        # Copies the values in, so the drone never ends up sharing a controller state with anything else.
+        self.fleet.drone_controls[self.row].copy_from(controls)
+
+    @property
+    def pos(self) -> np.ndarray:
+        return self.fleet.pos[self.row]
+
+    @pos.setter
+    def pos(self, value):
+        self.fleet.pos[self.row] = value
+
+    @property
+    def rot(self) -> np.ndarray:
+        return self.fleet.rot[self.row]
+
+    @rot.setter
+    def rot(self, value):
+        self.fleet.rot[self.row] = value
+
+    @property
+    def vel(self) -> np.ndarray:
+        return self.fleet.vel[self.row]
+
+    @vel.setter
+    def vel(self, value):
+        self.fleet.vel[self.row] = value
+
+    @property
+    def boost(self) -> float:
+        return self.fleet.boost[self.row]
+
+    @property
+    def time(self) -> float:
+        return self.fleet.time
+
+    @property
+    def orient_m(self) -> np.ndarray:
+        return self.fleet.orient[self.row]
 
     def update(self, game_car: PlayerInfo, time: float):
-        self.pos = a3v(game_car.physics.location)
-        self.rot = a3r(game_car.physics.rotation)
-        self.vel = a3v(game_car.physics.velocity)
-        self.boost = game_car.boost
-        self.orient_m = orient_matrix(self.rot)
-        self.time = time
+        self.fleet.update_row(self.row, game_car, time)
 
     def reset_ctrl(self):
-        self.ctrl = SimpleControllerState()
+        self.ctrl.reset()
+
+
+def special_sauce(x, a):
+    """Modified sigmoid to smooth out steering."""
+    # Graph: https://www.geogebra.org/m/udfp2zcy
+    return 2 / (1 + np.exp(a * x)) - 1
 
 
 def seek_pos(drone, position, max_speed=1410):
@@ -42,11 +170,6 @@ def seek_pos(drone, position, max_speed=1410):
     else:
         drone.ctrl.throttle = 0.0
 
-    def special_sauce(x, a):
-        """Modified sigmoid to smooth out steering."""
-        # Graph: https://www.geogebra.org/m/udfp2zcy
-        return 2 / (1 + np.exp(a * x)) - 1
-
     # Calculates the 2D angle to the position. Positive is clockwise.
     local_target = local(drone.orient_m, drone.pos, position)
     angle = np.arctan2(local_target[1], local_target[0])
@@ -64,11 +187,6 @@ def slow_to_pos(drone, position):
     # Finds 2D angle to target. Positive is clockwise.
     angle = np.arctan2(local_target[1], local_target[0])
 
-    def special_sauce(x, a):
-        """Modified sigmoid to smooth out steering."""
-        # Graph: https://www.geogebra.org/m/udfp2zcy
-        return 2 / (1 + np.exp(a * x)) - 1
-
     # Calculates steer.
     drone.ctrl.steer = special_sauce(angle, -5)
 
@@ -92,10 +210,6 @@ def slow_to_pos2(drone, position):
     TURN_SLOW = 300 # Maximum speed slowdown for turning.
     STOP_DIS = 40 # Stops if closer than this.
 
-    def special_sauce(x, a):
-        """Modified sigmoid function."""
-        return 2 / (1 + np.exp(a * x)) - 1
-
     # Get distance and speed.
     distance = np.linalg.norm(position - drone.pos)
     speed = np.linalg.norm(drone.vel)
@@ -147,29 +261,175 @@ def fast_to_pos(drone, position):
     # Finds 2D angle to target. Positive is clockwise.
     angle = np.arctan2(local_target[1], local_target[0])
 
-    def special_sauce(x, a):
-        """Modified sigmoid to smooth out steering."""
-        # Graph: https://www.geogebra.org/m/udfp2zcy
-        return 2 / (1 + np.exp(a * x)) - 1
-
     # Control towards hit position. Fully boosting.
     drone.ctrl.steer = special_sauce(angle, -5)
     drone.ctrl.throttle = 1.0
     drone.ctrl.boost = True
 
 
+class DriveControls:
+    """
+    Controls for a list of drones computed in one go by the fleet steering functions.
+    Fields which are None are not touched by the controller.
+    """
+
+    def __init__(self, throttle: np.ndarray, steer: np.ndarray,
+                 boost: np.ndarray = None, handbrake: np.ndarray = None):
+        self.throttle = throttle
+        self.steer = steer
+        self.boost = boost
+        self.handbrake = handbrake
+
+    def apply(self, drones: List[Drone]):
+        """Writes the controls into the drones' rows of the fleet's controls array."""
+        if not drones:
+            return
+        if not shares_fleet(drones):
+            for fleet in {id(drone.fleet): drone.fleet for drone in drones}.values():
+                mine = [i for i, drone in enumerate(drones) if drone.fleet is fleet]
+                self.select(mine).apply([drones[i] for i in mine])
+            return
+        controls = drones[0].fleet.controls
+        rows = [drone.row for drone in drones]
+        for name in ('throttle', 'steer', 'boost', 'handbrake'):
+            values = getattr(self, name)
+            if values is not None:
+                controls[rows, CONTROL_FIELDS.index(name)] = values
+
+    def select(self, indices: List[int]) -> 'DriveControls':
+        """The controls of only the drones at these positions in the list."""
+        def pick(values):
+            return None if values is None else np.asarray(values)[indices]
+        return DriveControls(pick(self.throttle), pick(self.steer), pick(self.boost), pick(self.handbrake))
+
+
+def shares_fleet(drones: List[Drone]) -> bool:
+    """Whether all the drones are rows of the same fleet, so they can be gathered with one index."""
+    return all(drone.fleet is drones[0].fleet for drone in drones)
+
+
+def fleet_state(drones: List[Drone]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gathers position, velocity and orientation of the drones from their fleet.
+
+    Arguments:
+        drones {List[Drone]} -- Drones, usually all from the same fleet. Otherwise their rows are stacked one by one.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray] -- Arrays of shape (N, 3), (N, 3) and (N, 3, 3).
+    """
+    if not drones:
+        return np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 3, 3))
+    fleet = drones[0].fleet
+    if not shares_fleet(drones):
+        return (np.array([drone.pos for drone in drones]), np.array([drone.vel for drone in drones]),
+                np.array([drone.orient_m for drone in drones]))
+    rows = [drone.row for drone in drones]
+    if rows == list(range(fleet.size)):
+        # The whole fleet in order, no need to copy anything.
+        return fleet.pos, fleet.vel, fleet.orient
+    return fleet.pos[rows], fleet.vel[rows], fleet.orient[rows]
+
+
+def seek_pos_fleet(drones: List[Drone], positions: np.ndarray, max_speed=1410) -> DriveControls:
+    """
+    Same as seek_pos, but for every drone at once. positions has shape (N, 3).
+    """
+    pos, vel, orient = fleet_state(drones)
+    speed = np.linalg.norm(vel, axis=1)
+    throttle = np.where(speed < max_speed, 1.0, 0.0)
+
+    local_target = local(orient, pos, positions)
+    angle = np.arctan2(local_target[:, 1], local_target[:, 0])
+    return DriveControls(throttle, special_sauce(angle, -5))
+
+
+def slow_to_pos_fleet(drones: List[Drone], positions: np.ndarray) -> DriveControls:
+    """
+    Same as slow_to_pos, but for every drone at once. positions has shape (N, 3).
+    """
+    pos, vel, orient = fleet_state(drones)
+    distance = np.linalg.norm(positions - pos, axis=1)
+    velocity = np.linalg.norm(vel, axis=1)
+    local_target = local(orient, pos, positions)
+    angle = np.arctan2(local_target[:, 1], local_target[:, 0])
+
+    # If facing the wrong way, drift. Otherwise use a PD controller to stop at the target.
+    drift = np.abs(angle) > 2
+    approach = ~drift & (distance > 100)
+    throttle = np.where(drift, 1.0, 0.0)
+    throttle[approach] = np.clip(0.3 * distance - 0.2 * velocity, -1.0, 1.0)[approach]
+
+    return DriveControls(throttle, special_sauce(angle, -5),
+                         boost=approach & (distance > 1000), handbrake=drift)
+
+
+def slow_to_pos2_fleet(drones: List[Drone], positions: np.ndarray) -> DriveControls:
+    """
+    Same as slow_to_pos2, but for every drone at once. positions has shape (N, 3).
+    """
+    TURN_DIS = 800 # Slows down for turns when farther than this.
+    TURN_SLOW = 300 # Maximum speed slowdown for turning.
+    STOP_DIS = 40 # Stops if closer than this.
+
+    pos, vel, orient = fleet_state(drones)
+    distance = np.linalg.norm(positions - pos, axis=1)
+    speed = np.linalg.norm(vel, axis=1)
+    local_target = local(orient, pos, positions)
+    angle = np.arctan2(local_target[:, 1], local_target[:, 0])
+
+    desired_speed = distance / 2
+    desired_speed -= np.where(distance > TURN_DIS, TURN_SLOW * special_sauce(angle, -2), 0.0)
+    desired_speed = np.clip(desired_speed, 0.0, 2300.0)
+
+    throttle = np.where((speed < desired_speed) & (distance > STOP_DIS), 1.0, 0.0)
+    return DriveControls(throttle, special_sauce(angle, -5))
+
+
+def turn_to_pos_fleet(drones: List[Drone], positions: np.ndarray, game_time: float) -> DriveControls:
+    """
+    Same as turn_to_pos, but for every drone at once. positions has shape (N, 3).
+    """
+    RATE = 0.2
+
+    pos, vel, orient = fleet_state(drones)
+    local_target = local(orient, pos, positions)
+    angle = np.arctan2(local_target[:, 1], local_target[:, 0])
+
+    # Every drone wiggles in sync, so forward is the same for all of them.
+    forward = round(game_time / RATE) % 2
+    for drone in drones:
+        drone.forward = forward
+
+    if forward:
+        return DriveControls(np.full(len(drones), 0.5), np.clip(angle, -1, 1))
+    return DriveControls(np.full(len(drones), -0.5), np.clip(-angle, -1, 1))
+
+
+def fast_to_pos_fleet(drones: List[Drone], positions: np.ndarray) -> DriveControls:
+    """
+    Same as fast_to_pos, but for every drone at once. positions has shape (N, 3).
+    """
+    pos, vel, orient = fleet_state(drones)
+    local_target = local(orient, pos, positions)
+    angle = np.arctan2(local_target[:, 1], local_target[:, 0])
+    return DriveControls(np.ones(len(drones)), special_sauce(angle, -5), boost=np.ones(len(drones), dtype=bool))
+
+
 def local(A: np.ndarray, p0: np.ndarray, p1: np.ndarray) -> np.ndarray:
     """Transforms world coordinates into local coordinates.
+    Also works on a stack of N orientation matrices and (N, 3) points, transforming all of them at once.
 
     Arguments:
-        A {np.ndarray} -- The local orientation matrix.
+        A {np.ndarray} -- The local orientation matrix, or a stack of them of shape (N, 3, 3).
         p0 {np.ndarray} -- World x, y, and z coordinates of the start point for the vector.
         p1 {np.ndarray} -- World x, y, and z coordinates of the end point for the vector.
 
     Returns:
         np.ndarray -- Local x, y, and z coordinates.
     """
-    return np.dot(A.T, p1 - p0)
+    if A.ndim == 2:
+        return np.dot(A.T, p1 - p0)
+    return np.einsum('nji,nj->ni', A, p1 - p0)
 
 
 def cap(value: float, minimum: float, maximum: float) -> float:
@@ -228,19 +488,16 @@ def a3v(v: Vector3) -> np.ndarray:
 
 
 def normalise(V : np.ndarray) -> np.ndarray:
-    """Normalises a vector.
+    """Normalises a vector, or every row of an array of vectors.
 
     Arguments:
-        V {np.ndarray} -- Vector.
+        V {np.ndarray} -- Vector, or array of vectors of shape (N, 3).
 
     Returns:
-        np.ndarray -- Normalised vector.
+        np.ndarray -- Normalised vector. Zero vectors are returned unchanged.
     """
-    magnitude = np.linalg.norm(V)
-    if magnitude != 0.0:
-        return V / magnitude
-    else:
-        return V
+    magnitude = np.linalg.norm(V, axis=-1, keepdims=True)
+    return np.divide(V, magnitude, out=np.array(V, dtype=float), where=magnitude != 0.0)
 
 
 def orient_matrix(R: np.ndarray) -> np.ndarray:
@@ -252,33 +509,46 @@ def orient_matrix(R: np.ndarray) -> np.ndarray:
     Returns:
         np.ndarray -- Orientation matrix of shape (3, 3).
     """
+    return orient_matrices(np.reshape(R, (1, 3)))[0]
+
+
+def orient_matrices(R: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Converts many sets of Euler angles to orientation matrices in one go.
+
+    Arguments:
+        R {np.ndarray} -- Pitch, yaw, and roll of shape (N, 3).
+        out {np.ndarray} -- Optional array of shape (N, 3, 3) to write the result into.
+
+    Returns:
+        np.ndarray -- Orientation matrices of shape (N, 3, 3).
+    """
     # Credits to chip https://samuelpmish.github.io/notes/RocketLeague/aerial_control/
-    pitch: float = R[0]
-    yaw: float = R[1]
-    roll: float = R[2]
+    pitch = R[:, 0]
+    yaw = R[:, 1]
+    roll = R[:, 2]
 
-    CR: float = np.cos(roll)
-    SR: float = np.sin(roll)
-    CP: float = np.cos(pitch)
-    SP: float = np.sin(pitch)
-    CY: float = np.cos(yaw)
-    SY: float = np.sin(yaw)
+    CR = np.cos(roll)
+    SR = np.sin(roll)
+    CP = np.cos(pitch)
+    SP = np.sin(pitch)
+    CY = np.cos(yaw)
+    SY = np.sin(yaw)
 
-    A = np.zeros((3, 3))
+    A = np.empty((len(R), 3, 3)) if out is None else out
 
     # front direction
-    A[0, 0] = CP * CY
-    A[1, 0] = CP * SY
-    A[2, 0] = SP
+    A[:, 0, 0] = CP * CY
+    A[:, 1, 0] = CP * SY
+    A[:, 2, 0] = SP
 
     # right direction (should be left but for some reason it is weird)
-    A[0, 1] = CY * SP * SR - CR * SY
-    A[1, 1] = SY * SP * SR + CR * CY
-    A[2, 1] = -CP * SR
+    A[:, 0, 1] = CY * SP * SR - CR * SY
+    A[:, 1, 1] = SY * SP * SR + CR * CY
+    A[:, 2, 1] = -CP * SR
 
     # up direction
-    A[0, 2] = -CR * CY * SP - SR * SY
-    A[1, 2] = -CR * SY * SP + SR * CY
-    A[2, 2] = CP * CR
+    A[:, 0, 2] = -CR * CY * SP - SR * SY
+    A[:, 1, 2] = -CR * SY * SP + SR * CY
+    A[:, 2, 2] = CP * CR
 
     return A
@@ -3,6 +3,7 @@ from typing import Callable, List
 from rlbot.agents.base_agent import SimpleControllerState
 from rlbot.utils.structures.game_data_struct import GameTickPacket
 
+from choreography.controls import frozen_controls
 from choreography.drone import Drone
 
 
@@ -64,7 +65,8 @@ class BlindBehaviorStep(PerDroneStep):
     """
     def __init__(self, controls: SimpleControllerState, duration: float):
         super().__init__(self.blind, duration)
-        self.controls = controls
+        # A read-only copy, so the preset can't be changed through a drone or by the caller.
+        self.controls = frozen_controls(controls)
 
     def blind(self, packet: GameTickPacket, drone: Drone, elapsed: float):
         drone.ctrl = self.controls
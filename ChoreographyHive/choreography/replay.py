@@ -0,0 +1,164 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from rlbot.utils.game_state_util import GameState, CarState, Physics, Vector3, Rotator
+from rlbot.utils.logging_utils import get_logger
+from rlbot.utils.structures.game_data_struct import GameTickPacket
+
+from choreography.choreography import Choreography
+from choreography.controls import BUTTON_FIELDS, CONTROL_FIELDS, reset_controls
+from choreography.drone import Drone
+from choreography.group_step import DroneListStep, GroupStep, StepResult
+from recorder import load_recording
+
+# Sticks are interpolated between recorded ticks, buttons keep the value of the latest recorded tick.
+ANALOG_COLUMNS = [column for column, name in enumerate(CONTROL_FIELDS) if name not in BUTTON_FIELDS]
+SET_FIELDS = ('location', 'rotation', 'velocity', 'angular_velocity')
+# Relative RECORDING paths are looked up here, not in the folder the hivemind happens to run in.
+RECORDINGS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'recordings')
+
+
+class ReplayStep(GroupStep):
+    """
+    Plays back a recording made with --record: the same controls and state setting at the same time
+    since the start, without running any choreography code.
+
+    If a car ends up further than drift_threshold from where it was in the recording, it is state set
+    back onto the recorded path. Set drift_threshold to None to never correct.
+    """
+
+    def __init__(self, recording: np.ndarray, game_interface, drift_threshold: Optional[float] = 200.0):
+        self.recording = recording
+        self.game_interface = game_interface
+        self.drift_threshold = drift_threshold
+        self.times = recording['seconds_elapsed'].astype(float) - float(recording['seconds_elapsed'][0])
+        self.start_time: Optional[float] = None
+        self.previous_tick = -1
+        self.corrections = 0
+
+    def perform(self, packet: GameTickPacket, drones: List[Drone]) -> StepResult:
+        if self.start_time is None:
+            self.start_time = packet.game_info.seconds_elapsed
+        elapsed = packet.game_info.seconds_elapsed - self.start_time
+        if len(self.times) == 0 or not drones:
+            return StepResult(finished=True)
+
+        # The recorded tick at or before elapsed, and how far we are towards the next one.
+        tick = int(np.clip(np.searchsorted(self.times, elapsed, side='right') - 1, 0, len(self.times) - 1))
+        next_tick = min(tick + 1, len(self.times) - 1)
+        span = self.times[next_tick] - self.times[tick]
+        fraction = min(max((elapsed - self.times[tick]) / span, 0.0), 1.0) if span > 0 else 0.0
+
+        num_cars = self.recording['controls'].shape[1]
+        rows = [drone.row for drone in drones if drone.index < num_cars]
+        indices = [drone.index for drone in drones if drone.index < num_cars]
+        controls = drones[0].fleet.controls
+
+        current, following = self.recording[tick], self.recording[next_tick]
+        recorded = current['controls'][indices]
+        recorded[:, ANALOG_COLUMNS] += fraction * (following['controls'][indices][:, ANALOG_COLUMNS] -
+                                                   recorded[:, ANALOG_COLUMNS])
+        controls[rows] = recorded
+
+        car_states = self.recorded_state_sets(tick, indices)
+        if self.drift_threshold is not None:
+            self.correct_drift(tick, next_tick, fraction, drones[0].fleet.pos[rows], indices, car_states)
+        if car_states:
+            self.game_interface.set_game_state(GameState(cars=car_states))
+
+        self.previous_tick = tick
+        return StepResult(finished=elapsed >= self.times[-1])
+
+    def recorded_state_sets(self, tick: int, indices: List[int]) -> dict:
+        """
+        Repeats the state setting recorded since the previous call. If several recorded ticks were passed
+        in one go, the latest value of each field wins, like it did in the game.
+        """
+        passed = self.recording[self.previous_tick + 1:tick + 1]
+        if len(passed) == 0:
+            return {}
+
+        latest = {}
+        for name in SET_FIELDS:
+            values = passed[f'set_{name}'][:, indices]
+            is_set = ~np.isnan(values)
+            # Index of the last recorded tick that set each component, -1 if none did.
+            last = len(values) - 1 - np.argmax(is_set[::-1], axis=0)
+            last[~is_set.any(axis=0)] = -1
+            latest[name] = np.where(last >= 0, np.take_along_axis(values, np.maximum(last, 0)[np.newaxis], 0)[0],
+                                    np.nan)
+
+        car_states = {}
+        for i, index in enumerate(indices):
+            vectors = {}
+            for name in SET_FIELDS:
+                values = latest[name][i]
+                if not np.isnan(values).all():
+                    components = [None if np.isnan(value) else value for value in values.tolist()]
+                    vectors[name] = Rotator(*components) if name == 'rotation' else Vector3(*components)
+            if vectors:
+                car_states[index] = CarState(physics=Physics(**vectors))
+        return car_states
+
+    def correct_drift(self, tick: int, next_tick: int, fraction: float, actual: np.ndarray,
+                      indices: List[int], car_states: dict):
+        """State sets cars which drifted too far from the recording back onto it, unless they are set anyway."""
+        current, following = self.recording[tick], self.recording[next_tick]
+        expected = current['location'][indices] + fraction * (following['location'][indices] -
+                                                              current['location'][indices])
+        drifted = np.flatnonzero(np.linalg.norm(actual - expected, axis=1) > self.drift_threshold)
+
+        for i in drifted.tolist():
+            index = indices[i]
+            if index in car_states:
+                continue
+            car_states[index] = CarState(physics=Physics(
+                location=Vector3(*expected[i].tolist()),
+                rotation=Rotator(*current['rotation'][index].tolist()),
+                velocity=Vector3(*current['velocity'][index].tolist()),
+                angular_velocity=Vector3(*current['angular_velocity'][index].tolist())))
+            self.corrections += 1
+
+
+class ReplayChoreography(Choreography):
+    """
+    Replays the recording at RECORDING, relative to RECORDINGS_DIRECTORY. Make a subclass in choreos with
+    your own RECORDING to replay a tuned show. If the file is missing, an error is logged and the drones idle.
+    """
+
+    RECORDING = 'recording.bin'
+    DRIFT_THRESHOLD = 200.0
+
+    def __init__(self, game_interface):
+        super().__init__()
+        self.game_interface = game_interface
+
+    @classmethod
+    def recording_path(cls) -> str:
+        return os.path.join(RECORDINGS_DIRECTORY, cls.RECORDING)
+
+    @classmethod
+    def get_num_bots(cls) -> int:
+        if not os.path.isfile(cls.recording_path()):
+            raise NotImplementedError
+        return load_recording(cls.recording_path())['controls'].shape[1]
+
+    def pre_step(self, drones: List[Drone]):
+        pass  # Every control is overwritten from the recording anyway.
+
+    @staticmethod
+    def idle(packet: GameTickPacket, drones: List[Drone], start_time: float) -> StepResult:
+        reset_controls(drones)
+        return StepResult(finished=False)
+
+    def generate_sequence(self, drones: List[Drone]):
+        self.sequence.clear()
+        path = self.recording_path()
+        if not os.path.isfile(path):
+            get_logger('Replay').error(f'There is no recording at {path} to replay, record one with --record={path}.')
+            # Idles instead of finishing, so the hivemind doesn't rebuild this every tick.
+            self.sequence.append(DroneListStep(self.idle))
+            return
+        self.sequence.append(ReplayStep(load_recording(path), self.game_interface, self.DRIFT_THRESHOLD))
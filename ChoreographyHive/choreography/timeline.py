@@ -0,0 +1,190 @@
+import math
+from typing import Dict, List, Union, Iterable, Optional
+
+import numpy as np
+
+from rlbot.agents.base_agent import SimpleControllerState
+from rlbot.utils.game_state_util import GameState, CarState, Physics, Vector3, Rotator
+from rlbot.utils.structures.game_data_struct import GameTickPacket
+
+from choreography.drone import Drone, CONTROL_FIELDS
+from choreography.group_step import GroupStep, StepResult
+
+Drones = Union[int, Iterable[int]]
+
+
+class Timeline:
+    """
+    A choreography written down ahead of time as keyframes, instead of as code that runs every tick.
+
+    Each drone has its own keyframes for position, rotation, controls and whether to state set it.
+    Positions and rotations are interpolated linearly between keyframes, controls and state setting
+    hold their value until the next keyframe. compile() samples all of it at the tick rate into dense
+    arrays, so playing it back costs the same every tick however many keyframes there are.
+
+    Example:
+        timeline = Timeline(len(drones))
+        timeline.keyframe(range(len(drones)), 0.0, position=start_positions, state_set=True)
+        timeline.keyframe(range(len(drones)), 2.0, position=end_positions, controls=SimpleControllerState(boost=True))
+        self.sequence.append(TimelineStep(timeline.compile(), self.game_interface))
+    """
+
+    def __init__(self, num_drones: int, tick_rate: float = 120.0):
+        self.num_drones = num_drones
+        self.tick_rate = tick_rate
+        # For every channel and drone, a list of (time, value).
+        self.keys: Dict[str, List[list]] = {
+            channel: [[] for _ in range(num_drones)] for channel in ('position', 'rotation', 'controls', 'state_set')
+        }
+
+    def keyframe(self, drones: Drones, time: float, position=None, rotation=None,
+                 controls: SimpleControllerState = None, state_set: bool = None):
+        """
+        Adds a keyframe for one or more drones. Values are either one value for all the drones,
+        or one per drone, e.g. positions of shape (N, 3). Channels left at None are not keyed.
+
+        Arguments:
+            drones {Drones} -- Index of the drone, or indices of the drones, in the list given to the TimelineStep.
+            time {float} -- Seconds since the start of the timeline.
+            position -- Location, as an (x, y, z) sequence.
+            rotation -- Pitch, yaw and roll.
+            controls {SimpleControllerState} -- Controls to output from this keyframe on.
+            state_set {bool} -- Whether to state set the drone to its position and rotation from this keyframe on.
+        """
+        drones = [drones] if isinstance(drones, int) else list(drones)
+        for channel, value in (('position', position), ('rotation', rotation)):
+            if value is not None:
+                values = np.broadcast_to(np.asarray(value, dtype=float), (len(drones), 3))
+                for drone, row in zip(drones, values):
+                    self.keys[channel][drone].append((time, row))
+
+        if controls is not None:
+            controls = [controls] * len(drones) if isinstance(controls, SimpleControllerState) else controls
+            for drone, ctrl in zip(drones, controls):
+                self.keys['controls'][drone].append(
+                    (time, np.array([float(getattr(ctrl, name)) for name in CONTROL_FIELDS])))
+
+        if state_set is not None:
+            flags = np.broadcast_to(np.asarray(state_set, dtype=bool), len(drones))
+            for drone, flag in zip(drones, flags):
+                self.keys['state_set'][drone].append((time, flag))
+
+    def duration(self) -> float:
+        times = [time for channel in self.keys.values() for drone_keys in channel for time, _ in drone_keys]
+        return max(times, default=0.0)
+
+    def compile(self) -> 'CompiledTimeline':
+        ticks = int(math.ceil(self.duration() * self.tick_rate)) + 1
+        times = np.arange(ticks) / self.tick_rate
+        n = self.num_drones
+
+        positions = np.zeros((ticks, n, 3))
+        rotations = np.zeros((ticks, n, 3))
+        controls = np.zeros((ticks, n, len(CONTROL_FIELDS)))
+        state_set = np.zeros((ticks, n), dtype=bool)
+        # Drones without position keyframes can't be state set.
+        has_position = np.zeros(n, dtype=bool)
+
+        for drone in range(n):
+            position_keys = sorted_keys(self.keys['position'][drone])
+            if position_keys is not None:
+                has_position[drone] = True
+                positions[:, drone] = interpolate(times, *position_keys)
+
+            rotation_keys = sorted_keys(self.keys['rotation'][drone])
+            if rotation_keys is not None:
+                key_times, values = rotation_keys
+                # Turns the short way round between keyframes.
+                values = np.unwrap(values, axis=0)
+                rotations[:, drone] = interpolate(times, key_times, values)
+
+            control_keys = sorted_keys(self.keys['controls'][drone])
+            if control_keys is not None:
+                controls[:, drone] = hold(times, *control_keys)
+
+            state_set_keys = sorted_keys(self.keys['state_set'][drone])
+            if state_set_keys is not None:
+                state_set[:, drone] = hold(times, *state_set_keys).astype(bool)
+
+        velocities = np.gradient(positions, times, axis=0) if ticks > 1 else np.zeros_like(positions)
+        return CompiledTimeline(self.tick_rate, positions, velocities, rotations, controls,
+                                state_set & has_position)
+
+
+class CompiledTimeline:
+    """
+    A Timeline sampled at the tick rate. Every array has the tick as its first axis and the drone as its second.
+    """
+
+    def __init__(self, tick_rate: float, positions: np.ndarray, velocities: np.ndarray, rotations: np.ndarray,
+                 controls: np.ndarray, state_set: np.ndarray):
+        self.tick_rate = tick_rate
+        self.positions = positions
+        self.velocities = velocities
+        self.rotations = rotations
+        self.controls = controls
+        self.state_set = state_set
+        self.ticks = len(positions)
+        self.duration = (self.ticks - 1) / tick_rate
+
+    def tick_at(self, elapsed: float) -> int:
+        return min(max(int(round(elapsed * self.tick_rate)), 0), self.ticks - 1)
+
+    def car_states(self, tick: int, drones: List[Drone]) -> Dict[int, CarState]:
+        car_states = {}
+        for i in np.flatnonzero(self.state_set[tick]).tolist():
+            position = self.positions[tick, i].tolist()
+            velocity = self.velocities[tick, i].tolist()
+            rotation = self.rotations[tick, i].tolist()
+            car_states[drones[i].index] = CarState(physics=Physics(
+                location=Vector3(*position), velocity=Vector3(*velocity), rotation=Rotator(*rotation),
+                angular_velocity=Vector3(0, 0, 0)))
+        return car_states
+
+
+class TimelineStep(GroupStep):
+    """
+    Plays back a compiled timeline. Each tick only looks up the row for the elapsed time, so the cost
+    doesn't depend on how the timeline was made. Drone i in the timeline is drones[i].
+    """
+
+    def __init__(self, timeline: CompiledTimeline, game_interface):
+        self.timeline = timeline
+        self.game_interface = game_interface
+        self.start_time: Optional[float] = None
+
+    def perform(self, packet: GameTickPacket, drones: List[Drone]) -> StepResult:
+        if self.start_time is None:
+            self.start_time = packet.game_info.seconds_elapsed
+        tick = self.timeline.tick_at(packet.game_info.seconds_elapsed - self.start_time)
+
+        for drone, values in zip(drones, self.timeline.controls[tick]):
+            drone.ctrl = values
+
+        car_states = self.timeline.car_states(tick, drones)
+        if car_states:
+            self.game_interface.set_game_state(GameState(cars=car_states))
+
+        return StepResult(finished=tick == self.timeline.ticks - 1)
+
+
+def sorted_keys(keys: list):
+    """Returns the times and values of keyframes sorted by time, or None if there are none."""
+    if not keys:
+        return None
+    keys = sorted(keys, key=lambda key: key[0])
+    return np.array([time for time, _ in keys]), np.array([value for _, value in keys])
+
+
+def interpolate(times: np.ndarray, key_times: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Linear interpolation of each column of values, holding the first and last value outside the keyframes."""
+    values = values.reshape(len(key_times), -1)
+    return np.column_stack([np.interp(times, key_times, values[:, column]) for column in range(values.shape[1])])
+
+
+def hold(times: np.ndarray, key_times: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Each time takes the value of the latest keyframe at or before it. Before the first keyframe, values are zero."""
+    index = np.searchsorted(key_times, times, side='right') - 1
+    held = values[np.maximum(index, 0)]
+    held[index < 0] = 0
+    return held
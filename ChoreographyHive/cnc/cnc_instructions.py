@@ -1,11 +1,14 @@
-import math
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Union
+
+import numpy as np
 
 from rlbot.agents.base_agent import SimpleControllerState
 from rlbot.utils.game_state_util import GameState, CarState, Vector3, Physics, Rotator
 
 from choreography.drone import Drone
+from cnc.drawing_plane import DrawingPlane
+from cnc.toolpath import Toolpath
 from util.vec import Vec3
 
 
@@ -63,12 +66,18 @@ class Move(Instruction):
 
 
 class BotCnc:
-    def __init__(self, origin: Vec3, normal: Vec3, scale: float, speed: float):
+    """
+    A list of instructions for drawing on a plane. Moves are stored in drawing coordinates, already scaled,
+    and compile() puts them in the world through the DrawingPlane, all at once.
+    """
+
+    def __init__(self, origin: Vec3, normal: Vec3, scale: float, speed: float, up: Vec3 = None):
         self.origin = origin
         self.normal = normal
         self.scale = scale
         self.speed = speed
-        self.previous_position = origin
+        self.plane = DrawingPlane(origin, normal, up)
+        self.previous_position = Vec3()
         self.list: List[Instruction] = []
 
     def activate_nozzle(self):
@@ -77,23 +86,46 @@ class BotCnc:
     def deactivate_nozzle(self):
         self.list.append(BoostOff())
 
-    def move_to_position(self, x: float, y: float):
-        end = self.origin + Vec3(x, y) * self.scale
-        # TODO: incorporate self.normal by doing some kind of rotation transform.
-        self.list.append(Move(self.previous_position, end, self.speed))
+    def move_to_position(self, x: float, y: float, z: float = 0.0, speed: float = None):
+        end = Vec3(x, y, z) * self.scale
+        self.list.append(Move(self.previous_position, end, self.speed if speed is None else speed))
         self.previous_position = end
 
+    def compile(self) -> Toolpath:
+        """
+        Turns the instruction list into a Toolpath. The nozzle instructions become the nozzle
+        state of the segments that follow them.
+        """
+        starts, ends, speeds, nozzle = [], [], [], []
+        nozzle_on = False
+        for instruction in self.list:
+            if isinstance(instruction, BoostOn):
+                nozzle_on = True
+            elif isinstance(instruction, BoostOff):
+                nozzle_on = False
+            elif instruction.motion_track:
+                track = instruction.motion_track
+                starts.append((track.start.x, track.start.y, track.start.z))
+                ends.append((track.end.x, track.end.y, track.end.z))
+                speeds.append(track.speed)
+                nozzle.append(nozzle_on)
+        return Toolpath.from_segments(self.plane.transform_points(np.array(starts, dtype=float).reshape(-1, 3)),
+                                      self.plane.transform_points(np.array(ends, dtype=float).reshape(-1, 3)),
+                                      np.array(speeds, dtype=float), np.array(nozzle, dtype=bool),
+                                      self.plane.car_rotation())
+
 
 @dataclass
 class CncExtruder:
-    def __init__(self, drones: List[Drone], bot_cnc: BotCnc):
+    def __init__(self, drones: List[Drone], bot_cnc: BotCnc, toolpath: Toolpath = None):
         self.drones = drones
-        self.step_index: int = 0
-        self.step_start_time: float = None
         self.bot_cnc = bot_cnc
+        self.toolpath = toolpath if toolpath is not None else bot_cnc.compile()
+        self.start_time: float = None
+        self.finished = False
 
     def is_finished(self):
-        return self.step_index >= len(self.bot_cnc.list)
+        return self.finished
 
     def arrange_drones(self, extruder_position: Vec3, velocity: Vec3, game_time: float) -> Dict[int, CarState]:
         car_states: Dict[int, CarState] = {}
@@ -105,58 +137,77 @@ class CncExtruder:
                 extruder_position.x + x_offset,
                 extruder_position.y,
                 extruder_position.z)
-            car_state.physics.rotation = Rotator(math.pi / 2, 0, 0)
+            car_state.physics.rotation = Rotator(*self.toolpath.rotation)
             car_states[drone.index] = car_state
         return car_states
 
     def manipulate_drones(self, game_time: float) -> InstructionResult:
-        step = self.bot_cnc.list[self.step_index]
-        step_finished = True
-        car_states = None
-
-        if step.drone_action:
-            for drone in self.drones:
-                step.drone_action(drone)
-
-        if step.motion_track:
-            if self.step_start_time:
-                elapsed = game_time - self.step_start_time
-                progression = elapsed / (step.motion_track.total_time + .00001)  # Avoid division by zero
-                if progression < 1:
-                    # This is the normal case where we're in the middle of drawing a segment
-                    loc = step.motion_track.start + step.motion_track.to_end * progression
-                    vel = step.motion_track.velocity
-                else:
-                    # Time has progressed to the point where we should already be done with this line segment.
-                    if self.step_index + 1 < len(self.bot_cnc.list) and self.bot_cnc.list[self.step_index + 1].motion_track:
-                        # The next step is also a line segment, so continue motion onto it
-                        self.step_start_time = self.step_start_time + step.motion_track.total_time
-                        self.step_index += 1
-                        next_step = self.bot_cnc.list[self.step_index]
-                        elapsed = game_time - self.step_start_time
-                        progression = elapsed / (next_step.motion_track.total_time + .00001)  # Avoid division by zero
-                        loc = next_step.motion_track.start + next_step.motion_track.to_end * progression
-                        vel = next_step.motion_track.velocity
-                    else:
-                        # The next step is not a line segment, so halt at the end of this one.
-                        loc = step.motion_track.end
-                        vel = Vec3()
-
-            else:
-                # This is the first time we've arrived at this line segment,
-                # initialize things and start at the beginning.
-                loc = step.motion_track.start
-                vel = step.motion_track.velocity
-                progression = 0
-                self.step_start_time = game_time
-
-            car_states = self.arrange_drones(loc, vel, game_time)
-
-            if progression < 1:
-                step_finished = False
-
-        if step_finished:
-            self.step_index += 1
-            self.step_start_time = None
+        if self.start_time is None:
+            self.start_time = game_time
+        elapsed = game_time - self.start_time
+
+        positions, velocities, nozzle = self.toolpath.sample(np.array([elapsed]))
+        for drone in self.drones:
+            drone.ctrl.boost = bool(nozzle[0])
+        car_states = self.arrange_drones(Vec3(*positions[0]), Vec3(*velocities[0]), game_time)
+
+        self.finished = elapsed >= self.toolpath.duration
+        return InstructionResult(self.finished, car_states)
+
+
+class ExtruderGroup:
+    """
+    Many single drone extruders, each starting at its own time offset. They either all follow the same toolpath,
+    or each follow their own, e.g. from partition_strokes. All drones on the same toolpath are evaluated with
+    one vectorized lookup per tick.
+    """
+
+    def __init__(self, drones: List[Drone], toolpaths: Union[Toolpath, List[Toolpath]], start_offsets: np.ndarray):
+        self.drones = list(drones)
+        if isinstance(toolpaths, Toolpath):
+            toolpaths = [toolpaths] * len(self.drones)
+        self.toolpaths = list(toolpaths)
+        self.start_offsets = np.asarray(start_offsets, dtype=float)
+        self.rotations = [Rotator(*toolpath.rotation) for toolpath in self.toolpaths]
+
+        # Drones on the same toolpath, grouped so each toolpath is sampled once.
+        groups: Dict[int, List[int]] = {}
+        for i, toolpath in enumerate(self.toolpaths):
+            groups.setdefault(id(toolpath), []).append(i)
+        self.groups = [np.array(rows) for rows in groups.values()]
+
+        # Drones with nothing to draw are finished from the start.
+        self.finished = np.array([len(toolpath.durations) == 0 for toolpath in self.toolpaths], dtype=bool)
+        self.durations = np.array([toolpath.duration for toolpath in self.toolpaths])
 
+    def is_finished(self):
+        return bool(np.all(self.finished))
+
+    def sample(self, times: np.ndarray):
+        positions = np.zeros((len(times), 3))
+        velocities = np.zeros((len(times), 3))
+        nozzle = np.zeros(len(times), dtype=bool)
+        for rows in self.groups:
+            positions[rows], velocities[rows], nozzle[rows] = self.toolpaths[rows[0]].sample(times[rows])
+        return positions, velocities, nozzle
+
+    def manipulate_drones(self, elapsed: float) -> InstructionResult:
+        """
+        Moves every started and unfinished drone to where it should be, elapsed seconds after the group started.
+        """
+        times = elapsed - self.start_offsets
+        active = (times >= 0) & ~self.finished
+        positions, velocities, nozzle = self.sample(times)
+
+        car_states: Dict[int, CarState] = {}
+        for i in np.flatnonzero(active).tolist():
+            drone = self.drones[i]
+            drone.ctrl.boost = bool(nozzle[i])
+            car_states[drone.index] = CarState(physics=Physics(
+                location=Vector3(*positions[i].tolist()),
+                velocity=Vector3(*velocities[i].tolist()),
+                rotation=self.rotations[i]))
+
+        # A drone finishes once it has been put at the end of its toolpath.
+        self.finished |= active & (times >= self.durations)
         return InstructionResult(self.is_finished(), car_states)
@@ -0,0 +1,65 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+from util.vec import Vec3
+
+
+class DrawingPlane:
+    """
+    The plane a drawing lies in. Drawing x goes right, drawing y goes up and drawing z comes out along the normal.
+
+    For a normal along the z axis, up defaults to the y axis, so the drawing's axes match the world's.
+    Otherwise up defaults to the world z axis, made perpendicular to the normal, so drawings on walls stand upright.
+
+    The rotation is computed once, and whole arrays of points are transformed at a time.
+    """
+
+    def __init__(self, origin: Vec3, normal: Vec3, up: Vec3 = None):
+        self.origin = np.array([origin.x, origin.y, origin.z], dtype=float)
+        normal = np.array([normal.x, normal.y, normal.z], dtype=float)
+        normal /= np.linalg.norm(normal)
+
+        if up is None:
+            up = Vec3(0, 1, 0) if abs(normal[2]) > 0.999 else Vec3(0, 0, 1)
+        up = np.array([up.x, up.y, up.z], dtype=float)
+        up -= normal * np.dot(up, normal)
+        if np.linalg.norm(up) < 1e-9:
+            raise ValueError('The up vector of a drawing plane must not be parallel to its normal.')
+        up /= np.linalg.norm(up)
+        right = np.cross(up, normal)
+
+        # Columns are the world directions of drawing x, y and z.
+        self.matrix = np.column_stack((right, up, normal))
+
+    def transform_points(self, points: np.ndarray) -> np.ndarray:
+        """Converts drawing coordinates of shape (K, 3) to world coordinates."""
+        return self.origin + points @ self.matrix.T
+
+    def transform_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """Rotates directions or velocities of shape (K, 3) from the drawing into the world."""
+        return vectors @ self.matrix.T
+
+    def car_rotation(self) -> Tuple[float, float, float]:
+        """
+        Pitch, yaw and roll of a car drawing on this plane. The car's nose points along the normal,
+        so its boost trail lands on the plane, and its roof points left along the drawing.
+        """
+        return rotation_from_vectors(self.matrix[:, 2], -self.matrix[:, 0])
+
+
+def rotation_from_vectors(forward: np.ndarray, up: np.ndarray) -> Tuple[float, float, float]:
+    """
+    Finds pitch, yaw and roll for a car with the given forward and up directions, inverting orient_matrices.
+    When the car points straight up or down, yaw and roll do the same thing, so roll is left at zero.
+    """
+    pitch = math.asin(max(-1.0, min(1.0, forward[2])))
+    if math.cos(pitch) < 1e-6:
+        sin_pitch = math.copysign(1.0, forward[2])
+        return pitch, math.atan2(-up[1] * sin_pitch, -up[0] * sin_pitch), 0.0
+
+    yaw = math.atan2(forward[1], forward[0])
+    left = np.cross(up, forward)
+    roll = math.atan2(-left[2], up[2])
+    return pitch, yaw, roll
@@ -1,6 +1,19 @@
+import math
+import re
+from typing import Iterable, Iterator, Tuple, Dict, List
+
 from cnc.cnc_instructions import BotCnc
+from cnc.toolpath import Toolpath
+from cnc.toolpath_cache import cache_key, cached_toolpath
 from util.vec import Vec3
 
+# A word is a letter followed by a number, e.g. G01, X-1.5 or F300.
+WORD = re.compile(r'([A-Z])\s*([+-]?(?:\d+\.?\d*|\.\d+))')
+# Comments are either in parentheses or run from a semicolon to the end of the line.
+COMMENT = re.compile(r'\([^)]*\)|;.*')
+
+RAPID, LINEAR, ARC_CW, ARC_CCW = 0, 1, 2, 3
+
 
 class GCodeParser:
     """
@@ -12,17 +25,153 @@ class GCodeParser:
 
     This allows us to use a wide variety of open source CNC (computer numerical control) software to
     define a path that a bot should take. Example: http://ncplot.com/stickfont/stickfont.htm
+
+    Supported: G00 rapid moves (nozzle off), G01 linear moves and G02/G03 arcs (nozzle on), with arcs
+    given by I/J centre offsets or by R. Arcs are flattened into line segments that stray no more than
+    arc_tolerance from the true arc. Also X/Y/Z words, F feed rates, G90/G91 absolute and relative
+    coordinates, several words per line, and comments. Everything else is ignored.
     """
+
+    def __init__(self, arc_tolerance: float = 0.01, feed_scale: float = None):
+        """
+        arc_tolerance is in file units. If feed_scale is given, feed moves go at F * feed_scale
+        instead of the speed passed to parse_file.
+        """
+        self.arc_tolerance = arc_tolerance
+        self.feed_scale = feed_scale
+
     def parse_file(self, file_name, origin: Vec3, normal: Vec3, scale: float, speed: float) -> BotCnc:
         bot_cnc = BotCnc(origin, normal, scale, speed)
         with open(file_name, 'r') as file:
-            for line in file:
-                if line[0] == 'G':
-                    if 'F' in line:
-                        bot_cnc.activate_nozzle()
-                    else:
-                        bot_cnc.deactivate_nozzle()
-                elif line[0] == 'X':
-                    coords = line[1:].split('Y')
-                    bot_cnc.move_to_position(float(coords[0]), float(coords[1]))
+            self.fill(bot_cnc, file)
         return bot_cnc
+
+    def load_toolpath(self, file_name, origin: Vec3, normal: Vec3, scale: float, speed: float) -> Toolpath:
+        """
+        Same as parse_file followed by compile, but the result is cached on disk and in memory,
+        keyed by the file contents and all the parameters.
+        """
+        with open(file_name, 'rb') as file:
+            source = file.read()
+        key = cache_key(source, (origin.x, origin.y, origin.z), (normal.x, normal.y, normal.z), scale, speed,
+                        self.arc_tolerance, self.feed_scale)
+        return cached_toolpath(key, lambda: self.parse_file(file_name, origin, normal, scale, speed).compile())
+
+    def fill(self, bot_cnc: BotCnc, lines: Iterable[str]):
+        """Adds the instructions from the G-code lines to bot_cnc."""
+        nozzle_on = None
+        for motion, x, y, z, feed in self.iter_moves(lines):
+            if (motion != RAPID) != nozzle_on:
+                nozzle_on = motion != RAPID
+                if nozzle_on:
+                    bot_cnc.activate_nozzle()
+                else:
+                    bot_cnc.deactivate_nozzle()
+            speed = None
+            if self.feed_scale is not None and motion != RAPID and feed:
+                speed = feed * self.feed_scale
+            bot_cnc.move_to_position(x, y, z, speed)
+
+    def iter_moves(self, lines: Iterable[str]) -> Iterator[Tuple[int, float, float, float, float]]:
+        """
+        Yields (motion, x, y, z, feed) for every straight line move, with arcs already flattened.
+        Lines that don't move the tool only update the modal state.
+        """
+        motion = RAPID
+        relative = False
+        feed = 0.0
+        x = y = z = 0.0
+
+        for words in iter_words(lines):
+            for code in words.get('G', []):
+                if code in (RAPID, LINEAR, ARC_CW, ARC_CCW):
+                    motion = int(code)
+                elif code == 90:
+                    relative = False
+                elif code == 91:
+                    relative = True
+            if 'F' in words:
+                feed = words['F'][-1]
+
+            if not any(axis in words for axis in 'XYZ'):
+                continue
+
+            def target(axis, current):
+                if axis not in words:
+                    return current
+                return current + words[axis][-1] if relative else words[axis][-1]
+
+            end_x, end_y, end_z = target('X', x), target('Y', y), target('Z', z)
+
+            if motion in (ARC_CW, ARC_CCW):
+                for point in self.flatten_arc(words, motion == ARC_CW, (x, y, z), (end_x, end_y, end_z)):
+                    yield (motion,) + point + (feed,)
+            elif (end_x, end_y, end_z) != (x, y, z):
+                yield motion, end_x, end_y, end_z, feed
+
+            x, y, z = end_x, end_y, end_z
+
+    def flatten_arc(self, words: Dict[str, List[float]], clockwise: bool,
+                    start: Tuple[float, float, float], end: Tuple[float, float, float]):
+        """Yields points along an arc in the XY plane, ending exactly at end. Z moves linearly (helix)."""
+        if 'R' in words:
+            center_x, center_y = arc_center_from_radius(start, end, words['R'][-1], clockwise)
+        else:
+            center_x = start[0] + words.get('I', [0.0])[-1]
+            center_y = start[1] + words.get('J', [0.0])[-1]
+
+        radius = math.hypot(start[0] - center_x, start[1] - center_y)
+        start_angle = math.atan2(start[1] - center_y, start[0] - center_x)
+        end_angle = math.atan2(end[1] - center_y, end[0] - center_x)
+
+        sweep = end_angle - start_angle
+        if clockwise and sweep >= 0:
+            sweep -= 2 * math.pi
+        elif not clockwise and sweep <= 0:
+            sweep += 2 * math.pi
+
+        # The largest angle step whose chord stays within arc_tolerance of the arc.
+        if radius > self.arc_tolerance:
+            max_step = 2 * math.acos(1 - self.arc_tolerance / radius)
+        else:
+            max_step = math.pi
+        steps = max(1, math.ceil(abs(sweep) / max_step))
+
+        for step in range(1, steps):
+            angle = start_angle + sweep * step / steps
+            yield (center_x + radius * math.cos(angle),
+                   center_y + radius * math.sin(angle),
+                   start[2] + (end[2] - start[2]) * step / steps)
+        yield end
+
+
+def iter_words(lines: Iterable[str]) -> Iterator[Dict[str, List[float]]]:
+    """
+    Yields the words of every line as a dict from letter to values, e.g. {'G': [1.0], 'X': [2.5]}.
+    Comments and empty lines are skipped.
+    """
+    for line in lines:
+        line = COMMENT.sub('', line).upper()
+        words: Dict[str, List[float]] = {}
+        for letter, value in WORD.findall(line):
+            words.setdefault(letter, []).append(float(value))
+        if words:
+            yield words
+
+
+def arc_center_from_radius(start, end, radius: float, clockwise: bool) -> Tuple[float, float]:
+    """
+    Finds the centre of an arc given by its radius. A negative radius means the long way round.
+    """
+    mid_x = (start[0] + end[0]) / 2
+    mid_y = (start[1] + end[1]) / 2
+    chord_x = end[0] - start[0]
+    chord_y = end[1] - start[1]
+    half_chord = math.hypot(chord_x, chord_y) / 2
+    if half_chord == 0:
+        return start[0], start[1]
+    offset = math.sqrt(max(radius ** 2 - half_chord ** 2, 0.0))
+    # The centre is to the right of the chord for a short clockwise arc.
+    side = 1 if clockwise == (radius > 0) else -1
+    return (mid_x + side * offset * chord_y / (2 * half_chord),
+            mid_y - side * offset * chord_x / (2 * half_chord))
@@ -0,0 +1,113 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from cnc.toolpath import Toolpath
+
+
+def partition_strokes(toolpath: Toolpath, drone_count: int, travel_speed: float = None) -> List[Toolpath]:
+    """
+    Splits the strokes (nozzle-on runs) of a toolpath between drones, so that they finish drawing at about the same time.
+
+    Strokes are handed out longest first, each to the drone which would finish it earliest, counting the travel
+    from that drone's previous stroke (longest processing time first scheduling). Each drone's strokes are then
+    ordered by nearest neighbour, reversing strokes where that saves travel.
+
+    Arguments:
+        toolpath {Toolpath} -- The whole drawing.
+        drone_count {int} -- How many toolpaths to make.
+        travel_speed {float} -- Speed of the nozzle-off moves between strokes. Defaults to the fastest segment speed.
+
+    Returns:
+        List[Toolpath] -- One toolpath per drone, each starting at its first stroke. Idle drones get empty toolpaths.
+    """
+    if drone_count == 0:
+        return []
+    strokes = toolpath.strokes()
+    speeds = np.linalg.norm(toolpath.velocities, axis=1)
+    if travel_speed is None:
+        travel_speed = float(speeds.max()) if len(speeds) else 1.0
+
+    ends = toolpath.ends
+    firsts = toolpath.starts[strokes[:, 0]]
+    lasts = ends[strokes[:, 1] - 1]
+    draw_times = np.array([toolpath.durations[first:stop].sum() for first, stop in strokes])
+
+    loads = np.zeros(drone_count)
+    positions = np.full((drone_count, 3), np.nan)
+    assigned: List[List[int]] = [[] for _ in range(drone_count)]
+    for stroke in np.argsort(-draw_times, kind='stable').tolist():
+        # A drone without strokes yet starts wherever its first stroke does, so travels nothing.
+        travel = np.minimum(np.linalg.norm(positions - firsts[stroke], axis=1),
+                            np.linalg.norm(positions - lasts[stroke], axis=1)) / travel_speed
+        finish = loads + np.nan_to_num(travel, nan=0.0) + draw_times[stroke]
+        drone = int(np.argmin(finish))
+        loads[drone] = finish[drone]
+        # It leaves the stroke from the end it didn't enter at.
+        to_first = np.linalg.norm(positions[drone] - firsts[stroke])
+        to_last = np.linalg.norm(positions[drone] - lasts[stroke])
+        positions[drone] = firsts[stroke] if to_last < to_first else lasts[stroke]
+        assigned[drone].append(stroke)
+
+    start = toolpath.starts[0] if len(toolpath.starts) else np.zeros(3)
+    toolpaths = []
+    for drone_strokes in assigned:
+        order = nearest_neighbour_order(firsts[drone_strokes], lasts[drone_strokes], start)
+        toolpaths.append(join_strokes(toolpath, [(drone_strokes[i], reverse) for i, reverse in order],
+                                      strokes, speeds, travel_speed))
+    return toolpaths
+
+
+def nearest_neighbour_order(firsts: np.ndarray, lasts: np.ndarray, start) -> List[Tuple[int, bool]]:
+    """
+    Orders strokes greedily by always going to the nearest stroke end next.
+
+    Returns:
+        List[Tuple[int, bool]] -- Index of each stroke, and whether to draw it backwards.
+    """
+    remaining = np.ones(len(firsts), dtype=bool)
+    position = np.asarray(start, dtype=float)
+
+    order = []
+    for _ in range(len(firsts)):
+        to_first = np.where(remaining, np.linalg.norm(firsts - position, axis=1), np.inf)
+        to_last = np.where(remaining, np.linalg.norm(lasts - position, axis=1), np.inf)
+        nearest_first, nearest_last = int(np.argmin(to_first)), int(np.argmin(to_last))
+        if to_first[nearest_first] <= to_last[nearest_last]:
+            order.append((nearest_first, False))
+            position = lasts[nearest_first]
+            remaining[nearest_first] = False
+        else:
+            order.append((nearest_last, True))
+            position = firsts[nearest_last]
+            remaining[nearest_last] = False
+    return order
+
+
+def join_strokes(toolpath: Toolpath, order: List[Tuple[int, bool]], strokes: np.ndarray,
+                 speeds: np.ndarray, travel_speed: float) -> Toolpath:
+    """Builds a toolpath drawing the given strokes in order, with nozzle-off travel moves between them."""
+    ends = toolpath.ends
+    parts_starts, parts_ends, parts_speeds, parts_nozzle = [], [], [], []
+    previous_end = None
+    for stroke, reverse in order:
+        first, stop = strokes[stroke]
+        starts, stroke_ends = toolpath.starts[first:stop], ends[first:stop]
+        if reverse:
+            starts, stroke_ends = stroke_ends[::-1], starts[::-1]
+        if previous_end is not None:
+            parts_starts.append(previous_end[np.newaxis])
+            parts_ends.append(starts[:1])
+            parts_speeds.append([travel_speed])
+            parts_nozzle.append([False])
+        parts_starts.append(starts)
+        parts_ends.append(stroke_ends)
+        parts_speeds.append(speeds[first:stop][::-1] if reverse else speeds[first:stop])
+        parts_nozzle.append(np.ones(stop - first, dtype=bool))
+        previous_end = stroke_ends[-1]
+
+    if not order:
+        return Toolpath.from_segments(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0), np.zeros(0, dtype=bool),
+                                      toolpath.rotation)
+    return Toolpath.from_segments(np.concatenate(parts_starts), np.concatenate(parts_ends),
+                                  np.concatenate(parts_speeds), np.concatenate(parts_nozzle), toolpath.rotation)
@@ -0,0 +1,122 @@
+from typing import List
+
+import numpy as np
+from svgpathtools import Document, Line
+
+from cnc.cnc_instructions import BotCnc
+from cnc.stroke_scheduler import nearest_neighbour_order
+from cnc.toolpath import Toolpath
+from cnc.toolpath_cache import cache_key, cached_toolpath
+from util.vec import Vec3
+
+# Curves are never split more often than this, even if they can't get within tolerance.
+MAX_DEPTH = 12
+
+
+class SvgParser:
+    """
+    Turns the paths in an SVG file into strokes for a BotCnc, so any vector drawing can be drawn with boost trails.
+
+    Every continuous subpath becomes one stroke (nozzle on). Curves and arcs are flattened into line segments
+    which stray no more than tolerance (in SVG units) from the curve, so gentle curves need few segments.
+    The strokes are then ordered to keep the travel moves between them (nozzle off) short.
+
+    SVG y points down, so y is flipped, and the drawing is moved so its bottom left corner is at the origin.
+    """
+
+    def __init__(self, tolerance: float = 0.5, order_strokes: bool = True):
+        self.tolerance = tolerance
+        self.order_strokes = order_strokes
+
+    def parse_file(self, file_name, origin: Vec3, normal: Vec3, scale: float, speed: float) -> BotCnc:
+        strokes = self.read_strokes(file_name)
+        if self.order_strokes:
+            strokes = order_strokes(strokes)
+
+        bot_cnc = BotCnc(origin, normal, scale, speed)
+        for stroke in strokes:
+            bot_cnc.deactivate_nozzle()
+            bot_cnc.move_to_position(*stroke[0])
+            bot_cnc.activate_nozzle()
+            for x, y in stroke[1:].tolist():
+                bot_cnc.move_to_position(x, y)
+        bot_cnc.deactivate_nozzle()
+        return bot_cnc
+
+    def load_toolpath(self, file_name, origin: Vec3, normal: Vec3, scale: float, speed: float) -> Toolpath:
+        """
+        Same as parse_file followed by compile, but the result is cached on disk and in memory,
+        keyed by the file contents and all the parameters.
+        """
+        with open(file_name, 'rb') as file:
+            source = file.read()
+        key = cache_key(source, 'svg', (origin.x, origin.y, origin.z), (normal.x, normal.y, normal.z), scale, speed,
+                        self.tolerance, self.order_strokes)
+        return cached_toolpath(key, lambda: self.parse_file(file_name, origin, normal, scale, speed).compile())
+
+    def read_strokes(self, file_name) -> List[np.ndarray]:
+        """
+        Returns the flattened strokes in file order, each an (K, 2) array of points with y flipped.
+        """
+        strokes = []
+        for path in Document(file_name).paths():
+            for subpath in path.continuous_subpaths():
+                if len(subpath) == 0:
+                    continue
+                points = [subpath[0].start]
+                for segment in subpath:
+                    points.extend(self.flatten(segment))
+                strokes.append(np.array([(point.real, -point.imag) for point in points]))
+
+        if strokes:
+            corner = np.min([stroke.min(axis=0) for stroke in strokes], axis=0)
+            strokes = [stroke - corner for stroke in strokes]
+        return strokes
+
+    def flatten(self, segment) -> List[complex]:
+        """
+        Returns points along the segment, excluding its start. Lines are returned as is, curves are
+        split in half until every piece is within tolerance of its chord.
+        """
+        if isinstance(segment, Line):
+            return [segment.end]
+
+        points = []
+        # The ends of the pieces still to be checked, the next one on top.
+        pending = [(1.0, segment.end, 0)]
+        t0, p0 = 0.0, segment.start
+        while pending:
+            t1, p1, depth = pending[-1]
+            if depth < MAX_DEPTH and not self.within_tolerance(segment, t0, p0, t1, p1):
+                t_mid = (t0 + t1) / 2
+                pending[-1] = (t1, p1, depth + 1)
+                pending.append((t_mid, segment.point(t_mid), depth + 1))
+                continue
+            pending.pop()
+            points.append(p1)
+            t0, p0 = t1, p1
+        return points
+
+    def within_tolerance(self, segment, t0: float, p0: complex, t1: float, p1: complex) -> bool:
+        """Checks a few points of the curve between t0 and t1 against the chord from p0 to p1."""
+        chord = p1 - p0
+        length = abs(chord)
+        for fraction in (0.25, 0.5, 0.75):
+            offset = segment.point(t0 + (t1 - t0) * fraction) - p0
+            if length == 0:
+                distance = abs(offset)
+            else:
+                distance = abs((offset * chord.conjugate()).imag) / length
+            if distance > self.tolerance:
+                return False
+        return True
+
+
+def order_strokes(strokes: List[np.ndarray], start=(0.0, 0.0)) -> List[np.ndarray]:
+    """
+    Orders strokes greedily by always going to the nearest stroke end next, reversing strokes where that is shorter.
+    """
+    firsts = np.array([stroke[0] for stroke in strokes]).reshape(-1, 2)
+    lasts = np.array([stroke[-1] for stroke in strokes]).reshape(-1, 2)
+    order = nearest_neighbour_order(firsts, lasts, start)
+    return [strokes[i][::-1] if reverse else strokes[i] for i, reverse in order]
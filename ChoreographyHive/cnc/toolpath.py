@@ -0,0 +1,104 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+# Pitch, yaw and roll of the cars when nothing else is given: nose up, for drawings in a horizontal plane.
+DEFAULT_ROTATION = (math.pi / 2, 0.0, 0.0)
+
+
+class Toolpath:
+    """
+    A BotCnc compiled into arrays, one row per straight line segment:
+
+    start_times -- When each segment starts, counted from the start of the toolpath.
+    durations -- How long each segment takes.
+    starts -- Where each segment starts, shape (M, 3).
+    velocities -- Velocity along each segment, shape (M, 3).
+    nozzle -- Whether the nozzle (boost) is on during each segment.
+    rotation -- Pitch, yaw and roll of the cars following the toolpath, see DrawingPlane.car_rotation.
+
+    The position at any time is found with a binary search over start_times, so any number of
+    drones can be evaluated at different times in one call to sample().
+    """
+
+    def __init__(self, start_times: np.ndarray, durations: np.ndarray, starts: np.ndarray,
+                 velocities: np.ndarray, nozzle: np.ndarray, rotation=DEFAULT_ROTATION):
+        self.start_times = start_times
+        self.durations = durations
+        self.starts = starts
+        self.velocities = velocities
+        self.nozzle = nozzle
+        self.rotation = tuple(float(angle) for angle in rotation)
+        self.duration = float(start_times[-1] + durations[-1]) if len(durations) else 0.0
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self.starts + self.velocities * self.durations[:, np.newaxis]
+
+    def nozzle_events(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the times at which the nozzle switches, and whether it switches on or off."""
+        switches = np.flatnonzero(np.diff(self.nozzle.astype(np.int8), prepend=0))
+        return self.start_times[switches], self.nozzle[switches]
+
+    def strokes(self) -> np.ndarray:
+        """Returns the first and stop segment index of every run of nozzle-on segments, shape (S, 2)."""
+        edges = np.diff(self.nozzle.astype(np.int8), prepend=0, append=0)
+        return np.column_stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+    def sample(self, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Looks up position, velocity and nozzle state at the given times.
+
+        Before the start, positions are at the first segment's start. After the end, they stay at the
+        last segment's end. Velocity is zero and the nozzle is off outside of the toolpath.
+
+        Arguments:
+            times {np.ndarray} -- Times since the start of the toolpath, shape (K,).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray] -- Positions (K, 3), velocities (K, 3) and nozzle (K,).
+        """
+        times = np.asarray(times, dtype=float)
+        if len(self.start_times) == 0:
+            return np.zeros((len(times), 3)), np.zeros((len(times), 3)), np.zeros(len(times), dtype=bool)
+
+        index = np.clip(np.searchsorted(self.start_times, times, side='right') - 1, 0, len(self.start_times) - 1)
+        segment_time = np.clip(times - self.start_times[index], 0.0, self.durations[index])
+
+        velocities = self.velocities[index]
+        positions = self.starts[index] + velocities * segment_time[:, np.newaxis]
+
+        running = (times >= 0) & (times < self.duration)
+        velocities[~running] = 0.0
+        nozzle = self.nozzle[index] & running
+        return positions, velocities, nozzle
+
+    def to_table(self) -> np.ndarray:
+        """Packs the toolpath into one (M + 1, 9) array, for caching. The first row holds the rotation."""
+        header = np.zeros((1, 9))
+        header[0, :3] = self.rotation
+        return np.concatenate((header, np.column_stack(
+            (self.start_times, self.durations, self.starts, self.velocities, self.nozzle))))
+
+    @staticmethod
+    def from_table(table: np.ndarray) -> 'Toolpath':
+        """Unpacks an array made by to_table. The toolpath uses views into it, so it can be memory-mapped."""
+        rows = table[1:]
+        return Toolpath(rows[:, 0], rows[:, 1], rows[:, 2:5], rows[:, 5:8], rows[:, 8] != 0, table[0, :3])
+
+    @staticmethod
+    def from_segments(starts: np.ndarray, ends: np.ndarray, speeds: np.ndarray, nozzle: np.ndarray,
+                      rotation=DEFAULT_ROTATION) -> 'Toolpath':
+        """
+        Builds a toolpath from straight line segments. Segments of zero length are dropped.
+        """
+        to_end = ends - starts
+        lengths = np.linalg.norm(to_end, axis=1)
+        keep = lengths > 0
+        to_end, lengths, speeds = to_end[keep], lengths[keep], speeds[keep]
+
+        durations = lengths / speeds
+        start_times = np.cumsum(durations) - durations
+        velocities = to_end * (speeds / lengths)[:, np.newaxis]
+        return Toolpath(start_times, durations, starts[keep], velocities, nozzle[keep], rotation)
@@ -0,0 +1,48 @@
+import hashlib
+import os
+from typing import Callable, Dict
+
+import numpy as np
+
+from cnc.toolpath import Toolpath
+
+# Bump this whenever parsing or compiling changes, so stale toolpaths are not loaded.
+CACHE_VERSION = 2
+CACHE_DIRECTORY = os.path.join(os.path.dirname(__file__), '.toolpath_cache')
+
+# Toolpaths already loaded by this process.
+_loaded: Dict[str, Toolpath] = {}
+
+
+def cache_key(source: bytes, *params) -> str:
+    """
+    Hashes the source file contents together with everything else that affects the toolpath,
+    e.g. origin, normal, scale and speed.
+    """
+    digest = hashlib.sha1(source)
+    digest.update(repr((CACHE_VERSION,) + params).encode())
+    return digest.hexdigest()
+
+
+def cached_toolpath(key: str, build: Callable[[], Toolpath]) -> Toolpath:
+    """
+    Returns the toolpath for this key, from memory, from the memory-mapped cache file,
+    or by calling build and storing the result.
+    """
+    if key in _loaded:
+        return _loaded[key]
+
+    path = os.path.join(CACHE_DIRECTORY, f'{key}.npy')
+    if os.path.isfile(path):
+        toolpath = Toolpath.from_table(np.load(path, mmap_mode='r'))
+    else:
+        toolpath = build()
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        # Writes to a temporary file first so that a half written cache file is never loaded.
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            np.save(file, toolpath.to_table())
+        os.replace(temporary_path, path)
+
+    _loaded[key] = toolpath
+    return toolpath
@@ -0,0 +1,173 @@
+'''Runs the Hivemind in its own process, so the GUI thread never competes with it for the GIL.'''
+
+import sys
+from multiprocessing import Pipe, get_context, resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+from queue import Empty
+from typing import Dict
+
+import numpy as np
+
+from rlbot.utils.logging_utils import get_logger
+from rlbot.utils.structures.start_match_structures import MAX_PLAYERS
+
+from choreography.drone import DroneFleet
+from queue_commands import QCommand
+from recorder import Recorder
+from tick_profiler import TickProfiler
+
+# The shared fleet memory can be opened by name from any process, e.g. a monitoring UI.
+SHARED_FLEET_NAME = 'choreography_fleet'
+
+# Spawned rather than forked on every platform, so each hivemind process imports fresh code.
+CONTEXT = get_context('spawn')
+
+
+def hivemind_options(arguments: dict) -> dict:
+    """
+    Optional Hivemind features which were switched on from the command line.
+    """
+    options = {'scheduler_mode': arguments['--scheduler'], 'hot_reload': arguments['--hot-reload']}
+    if arguments['--profile']:
+        options['profiler'] = TickProfiler(arguments['--profile-dump'])
+    if arguments['--record'] is not None:
+        options['recorder'] = Recorder(arguments['--record'])
+    return options
+
+
+class PipeQueue:
+    """
+    Looks like the queue.Queue the Hivemind expects, but sends the QCommands through one end of a pipe.
+    """
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+
+    def put(self, command):
+        self.connection.send(command)
+
+    def get(self):
+        return self.connection.recv()
+
+    def empty(self) -> bool:
+        return not self.connection.poll()
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Opens shared memory made by another process. Only the creator may unlink it, so it is kept away from this
+    process's resource tracker, which would otherwise unlink it when this process exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    memory = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
+
+
+class SharedFleetMemory:
+    """
+    Shared memory holding the fleet's pos, rot, vel, boost and controls arrays, with room for MAX_PLAYERS drones.
+    The first 8 bytes hold the number of drones in use. The hivemind process writes, anyone can read without copying:
+
+        memory = SharedFleetMemory(create=False)
+        positions = memory.arrays['pos'][:memory.count[0]]
+    """
+
+    def __init__(self, name: str = SHARED_FLEET_NAME, create: bool = True, capacity: int = MAX_PLAYERS):
+        self.capacity = capacity
+        self.layout: Dict[str, tuple] = {}
+        offset = 8
+        for field, shape in DroneFleet.SHAPES.items():
+            shape = (capacity,) + shape
+            self.layout[field] = (offset, shape)
+            offset += int(np.prod(shape)) * 8
+
+        if not create:
+            self.memory = attach_shared_memory(name)
+        else:
+            try:
+                self.memory = shared_memory.SharedMemory(name=name, create=True, size=offset)
+            except FileExistsError:
+                # Left behind by a run which never got to unlink it, e.g. after a crash.
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self.memory = shared_memory.SharedMemory(name=name, create=True, size=offset)
+        self.count = np.ndarray((1,), dtype=np.int64, buffer=self.memory.buf, offset=0)
+        self.arrays: Dict[str, np.ndarray] = {
+            field: np.ndarray(shape, dtype=np.float64, buffer=self.memory.buf, offset=field_offset)
+            for field, (field_offset, shape) in self.layout.items()
+        }
+        if create:
+            self.count[0] = 0
+
+    def make_fleet(self, size: int) -> DroneFleet:
+        """Creates a fleet whose arrays live in the shared memory."""
+        if size > self.capacity:
+            raise ValueError(f'The shared fleet memory only fits {self.capacity} drones, not {size}.')
+        fleet = DroneFleet(size, {field: array[:size] for field, array in self.arrays.items()})
+        self.count[0] = size
+        return fleet
+
+    def close(self):
+        self.count = None
+        self.arrays = {}
+        try:
+            self.memory.close()
+        except BufferError:
+            # A fleet still has views into it. The mapping goes away with the process anyway.
+            pass
+
+    def unlink(self):
+        """Removes the memory once nobody uses it anymore. Only call this in the process which created it."""
+        self.memory.unlink()
+
+
+def run_hivemind(connection: Connection, choreo_obj, arguments: dict, memory_name: str):
+    """Entry point of the hivemind process. Returns once the hivemind receives a STOP command."""
+    from hivemind import Hivemind
+
+    memory = SharedFleetMemory(memory_name, create=False)
+    try:
+        my_hivemind = Hivemind(PipeQueue(connection), choreo_obj, fleet_factory=memory.make_fleet,
+                               **hivemind_options(arguments))
+        my_hivemind.start()
+    finally:
+        memory.close()
+
+
+class HiveProcess:
+    """
+    Runs one Hivemind in a new process and forwards QCommands from the GUI's queue to it.
+    """
+
+    # How often to check whether the process is still alive while no commands come in.
+    ALIVE_CHECK_INTERVAL = 0.5
+
+    def __init__(self, choreo_obj, arguments: dict, memory: SharedFleetMemory):
+        self.logger = get_logger('Hive Process')
+        self.connection, child_connection = Pipe()
+        self.process = CONTEXT.Process(target=run_hivemind, name='Hivemind', daemon=True,
+                               args=(child_connection, choreo_obj, arguments, memory.memory.name))
+        self.process.start()
+
+    def forward(self, queue):
+        """
+        Passes commands on to the hivemind until it is told to stop, then waits for the process to end.
+        Also returns if the process dies on its own.
+        """
+        while True:
+            if not self.process.is_alive():
+                self.logger.error(f'The hivemind process exited with code {self.process.exitcode}.')
+                self.connection.close()
+                return
+            try:
+                command = queue.get(timeout=self.ALIVE_CHECK_INTERVAL)
+            except Empty:
+                continue
+            self.connection.send(command)
+            if command == QCommand.STOP:
+                self.process.join()
+                self.connection.close()
+                return
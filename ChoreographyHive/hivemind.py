@@ -1,15 +1,19 @@
 '''The Hivemind'''
 
-from rlbot.utils.structures.bot_input_struct import PlayerInput
-from rlbot.agents.base_agent import SimpleControllerState
+import traceback
+
 from rlbot.utils.logging_utils import get_logger
 from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket
 from rlbot.utils.structures.game_interface import GameInterface
 
-import time
-
-from choreography.drone import Drone
+from choreo_watcher import ChoreoWatcher
+from choreography.drone import Drone, DroneFleet
+from input_batch import PlayerInputBatch
 from queue_commands import QCommand
+from recorder import Recorder
+from state_set_buffer import StateSetBuffer
+from tick_profiler import TickProfiler
+from tick_scheduler import TickScheduler
 
 class Hivemind:
     """
@@ -20,23 +24,45 @@ class Hivemind:
     # hivemind = the process which controls the drones.
     # drone = a bot under the hivemind's control.
 
-    def __init__(self, queue, choreo_obj):
+    def __init__(self, queue, choreo_obj, game_interface=None, profiler: TickProfiler = None,
+                 scheduler_mode: str = 'adaptive', recorder: Recorder = None, fleet_factory=DroneFleet,
+                 hot_reload: bool = False):
         # Sets up the logger. The string is the name of your hivemind.
         # Call this something unique so people can differentiate between hiveminds.
         self.logger = get_logger('Choreography Hivemind')
 
         # The game interface is how you get access to things
         # like ball prediction, the game tick packet, or rendering.
-        self.game_interface = GameInterface(self.logger)
+        # Another interface can be passed in, e.g. a SimGameInterface to run without the game.
+        self.game_interface = game_interface if game_interface is not None else GameInterface(self.logger)
 
         self.drones = []
+        # Makes the fleet arrays, e.g. in shared memory when running in its own process.
+        self.fleet_factory = fleet_factory
+        self.fleet = DroneFleet(0)
+        self.player_inputs = PlayerInputBatch(0)
+
+        # Choreographies state set through this buffer, so that everything
+        # they set during a tick is sent to the game as a single GameState.
+        self.state_buffer = StateSetBuffer(self.game_interface)
+
+        # Optional instrumentation of every tick.
+        self.profiler = profiler
+
+        # Optional recording of every tick to a file.
+        self.recorder = recorder
 
-        self.choreo = choreo_obj(self.game_interface)
-        self.choreo.generate_sequence(self.drones)
+        self.choreo = self.build_choreo(choreo_obj)
+
+        # Optionally rebuilds the choreography when its file is saved, swapped in between ticks.
+        self.watcher = ChoreoWatcher(choreo_obj) if hot_reload else None
 
         # Set up queue to know when to stop and reload.
         self.queue = queue
 
+        # Decides how we wait for new packets.
+        self.scheduler = TickScheduler(self.game_interface, scheduler_mode)
+
     def start(self):
         """Runs once, sets up the hivemind and its agents."""
         # Prints an activation message into the console.
@@ -61,7 +87,18 @@ class Hivemind:
         self.drones = []
 
         # Runs the game loop where the hivemind will spend the rest of its time.
+        if self.watcher is not None:
+            self.watcher.start()
         self.game_loop()
+        if self.watcher is not None:
+            self.watcher.stop()
+
+        self.scheduler.log_summary()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.profiler is not None:
+            self.profiler.log_summary()
+            self.profiler.dump()
 
     def game_loop(self):
 
@@ -70,41 +107,83 @@ class Hivemind:
 
         # MAIN LOOP:
         while self.loop_check():
-            #print('test')
-
-            prev_time = packet.game_info.seconds_elapsed
-            # Updating the game tick packet.
-            self.game_interface.update_live_data_packet(packet)
-
-            # Checking if packet is new, otherwise sleep.
-            if prev_time == packet.game_info.seconds_elapsed:
-                time.sleep(0.001)
+            # Waits for a new game tick packet, otherwise checks the queue again.
+            if not self.scheduler.next_packet(packet):
                 continue
 
-            # Create a Drone object for every drone that holds its information.
-            if packet.num_cars > len(self.drones):
-                # Clears the list if there are more cars than drones.
-                self.drones.clear()
-                for index in range(packet.num_cars):
-                    self.drones.append(Drone(index, packet.game_cars[index].team))
-
-            # Processing drone data.
-            for drone in self.drones:
-                drone.update(packet.game_cars[drone.index], packet.game_info.seconds_elapsed)
-
-            # Steps through the choreography.
-            self.choreo.step(packet, self.drones)
+            self.tick(packet, self.scheduler.read_duration)
+            self.scheduler.inputs_sent()
 
-            # Resets choreography once it has finished.
-            if self.choreo.finished:
-                # Re-instantiates the choreography.
-                self.choreo = self.choreo.__class__(self.game_interface)
-                self.choreo.generate_sequence(self.drones)
-
-            # Sends the drone inputs to the drones.
-            for drone in self.drones:
-                self.game_interface.update_player_input(
-                    convert_player_input(drone.ctrl), drone.index)
+    def tick(self, packet: GameTickPacket, packet_duration: float = None):
+        """
+        Processes a single new packet: updates the drones, steps the choreography and sends the inputs.
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_tick(packet.game_info.seconds_elapsed, packet_duration)
+
+        # Create a Drone object for every drone that holds its information.
+        if packet.num_cars > len(self.drones):
+            # Clears the list if there are more cars than drones.
+            self.drones.clear()
+            self.fleet = self.fleet_factory(packet.num_cars)
+            self.player_inputs = PlayerInputBatch(packet.num_cars)
+            for index in range(packet.num_cars):
+                self.drones.append(Drone(index, packet.game_cars[index].team, self.fleet))
+
+        # Processing drone data. Fills the fleet arrays in place, the drones are views into them.
+        self.fleet.update(packet)
+        if profiler is not None:
+            profiler.lap('drones')
+
+        # Swaps in a hot reloaded choreography. Its module was reloaded on the watcher's thread,
+        # but it is built here, where nothing else touches the drones or the state set buffer.
+        if self.watcher is not None:
+            choreo_class = self.watcher.take()
+            if choreo_class is not None:
+                self.swap_choreo(choreo_class)
+
+        # Steps through the choreography.
+        self.choreo.step(packet, self.drones)
+
+        # Resets choreography once it has finished.
+        if self.choreo.finished:
+            # Re-instantiates the choreography.
+            self.choreo = self.build_choreo(self.choreo.__class__)
+
+        if profiler is not None:
+            profiler.lap('choreo')
+
+        # Sends this tick's state setting.
+        self.state_buffer.flush(packet)
+        if profiler is not None:
+            profiler.lap('state_set')
+
+        # Sends the drone inputs to the drones. Their controls are already in the fleet's array.
+        self.player_inputs.submit(self.game_interface, self.fleet)
+
+        if self.recorder is not None:
+            self.recorder.record(packet, self.fleet, self.state_buffer)
+
+        if profiler is not None:
+            profiler.lap('inputs')
+            profiler.end_tick()
+
+    def swap_choreo(self, choreo_class):
+        """Replaces the choreography with a new one, or keeps it if the new one fails to build."""
+        try:
+            self.choreo = self.build_choreo(choreo_class)
+        except Exception:
+            self.logger.error(f'Could not build the reloaded {choreo_class.__name__}, '
+                              f'keeping the running choreography.\n{traceback.format_exc()}')
+
+    def build_choreo(self, choreo_class):
+        choreo = choreo_class(self.state_buffer)
+        if self.profiler is not None:
+            # Times every step the choreography performs, including those on parallel tracks.
+            choreo.record_step = self.profiler.record_step
+        choreo.generate_sequence(self.drones)
+        return choreo
 
     def loop_check(self):
         """
@@ -117,19 +196,3 @@ class Hivemind:
             message = self.queue.get()
             return message != QCommand.STOP
 
-
-def convert_player_input(ctrl: SimpleControllerState) -> PlayerInput:
-    """
-    Converts a SimpleControllerState to a PlayerInput object.
-    """
-    player_input = PlayerInput()
-    player_input.throttle = ctrl.throttle
-    player_input.steer = ctrl.steer
-    player_input.pitch = ctrl.pitch
-    player_input.yaw = ctrl.yaw
-    player_input.roll = ctrl.roll
-    player_input.jump = ctrl.jump
-    player_input.boost = ctrl.boost
-    player_input.handbrake = ctrl.handbrake
-    player_input.use_item = ctrl.use_item
-    return player_input
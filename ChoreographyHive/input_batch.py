@@ -0,0 +1,56 @@
+import ctypes
+
+import numpy as np
+
+from rlbot.utils.structures.bot_input_struct import PlayerInput
+
+from choreography.drone import DroneFleet, CONTROL_FIELDS
+
+# Layout of PlayerInput, used to fill all the preallocated structs in one go.
+INPUT_DTYPE = np.dtype({
+    'names': list(CONTROL_FIELDS),
+    'formats': ['<f4'] * 5 + ['?'] * 4,
+    'offsets': [getattr(PlayerInput, name).offset for name in CONTROL_FIELDS],
+    'itemsize': ctypes.sizeof(PlayerInput)
+})
+
+
+class PlayerInputBatch:
+    """
+    Sends the controls of a whole fleet to the game.
+
+    The PlayerInput structs are allocated once and filled straight from the fleet's control array.
+    Drones whose controls did not change since the last tick are skipped, since the game keeps
+    using the last input it got. If the game interface has an update_player_inputs method,
+    everything goes out in one call, otherwise there is one update_player_input call per drone.
+    """
+
+    def __init__(self, size: int, skip_unchanged: bool = True):
+        self.size = size
+        self.skip_unchanged = skip_unchanged
+        self.inputs = (PlayerInput * size)()
+        self.structs = [self.inputs[index] for index in range(size)]
+        self.view = np.frombuffer(self.inputs, dtype=INPUT_DTYPE)
+        # What we sent last, NaN so that everything gets sent the first time.
+        self.sent = np.full((size, len(CONTROL_FIELDS)), np.nan)
+
+    def submit(self, game_interface, fleet: DroneFleet):
+        controls = fleet.controls
+        if self.skip_unchanged:
+            changed = np.flatnonzero(np.any(controls != self.sent, axis=1))
+            if len(changed) == 0:
+                return
+        else:
+            changed = np.arange(self.size)
+
+        for column, name in enumerate(CONTROL_FIELDS):
+            self.view[name] = controls[:, column]
+        self.sent[changed] = controls[changed]
+
+        indices = changed.tolist()
+        if hasattr(game_interface, 'update_player_inputs'):
+            game_interface.update_player_inputs(self.inputs, indices)
+        else:
+            structs = self.structs
+            for index in indices:
+                game_interface.update_player_input(structs[index], index)
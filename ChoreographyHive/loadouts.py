@@ -0,0 +1,86 @@
+import copy
+import os
+from typing import Dict, List, Optional, Tuple
+
+from rlbot.matchconfig.loadout_config import LoadoutConfig
+from rlbot.parsing.agent_config_parser import create_looks_configurations, load_bot_appearance
+from rlbot.parsing.bot_config_bundle import get_bot_config_bundle
+
+
+def apply_overrides(loadout: LoadoutConfig, overrides: Dict[str, int]) -> LoadoutConfig:
+    """
+    Returns a copy of the loadout with the overrides set, e.g. {'boost_id': 32, 'paint_config.boost_paint_id': 1}.
+    """
+    loadout = copy.deepcopy(loadout)
+    for field, value in overrides.items():
+        *path, name = field.split('.')
+        target = loadout
+        for part in path:
+            target = getattr(target, part)
+        if not hasattr(target, name):
+            raise AttributeError(f'Loadouts have no {field} to override.')
+        setattr(target, name, value)
+    return loadout
+
+
+class LoadoutCache:
+    """
+    Keeps the loadouts parsed from looks configs, and the choreographies' appearance overrides, between match
+    setups. A looks config is only parsed again once its file changed.
+    """
+
+    def __init__(self):
+        # (looks path, team) -> (mtime, loadout)
+        self.loadouts: Dict[Tuple[str, int], Tuple[float, LoadoutConfig]] = {}
+        # (looks path, team, overrides) -> (mtime, loadout with the overrides)
+        self.overridden: Dict[tuple, Tuple[float, LoadoutConfig]] = {}
+        # (choreography, number of drones) -> overrides per drone index
+        self.tables: Dict[tuple, Dict[int, Dict[str, int]]] = {}
+        # Bot config path -> (mtime, looks path)
+        self.looks_paths: Dict[str, Tuple[float, str]] = {}
+
+    def loadout(self, looks_path: str, team: int = 0, overrides: Dict[str, int] = None) -> LoadoutConfig:
+        """
+        The loadout of a looks config with the overrides applied. The same object is returned until the file changes,
+        so don't modify it.
+        """
+        mtime = os.stat(looks_path).st_mtime
+        if overrides:
+            key = (looks_path, team, tuple(sorted(overrides.items())))
+            cached = self.overridden.get(key)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, apply_overrides(self.loadout(looks_path, team), overrides))
+                self.overridden[key] = cached
+            return cached[1]
+
+        cached = self.loadouts.get((looks_path, team))
+        if cached is None or cached[0] != mtime:
+            looks_config = create_looks_configurations().parse_file(looks_path)
+            cached = (mtime, load_bot_appearance(looks_config, team))
+            self.loadouts[(looks_path, team)] = cached
+        return cached[1]
+
+    def looks_path(self, config_path: str) -> str:
+        """The looks config of a bot config."""
+        mtime = os.stat(config_path).st_mtime
+        cached = self.looks_paths.get(config_path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, get_bot_config_bundle(config_path).looks_path)
+            self.looks_paths[config_path] = cached
+        return cached[1]
+
+    def appearance_table(self, choreo_class, num_drones: int) -> Dict[int, Dict[str, int]]:
+        """The choreography's appearance overrides for this many drones, worked out once."""
+        key = (choreo_class, num_drones)
+        if key not in self.tables:
+            self.tables[key] = choreo_class.get_appearance_overrides(num_drones)
+        return self.tables[key]
+
+    def appearances(self, choreo_class, looks_paths: List[Optional[str]]) -> List[Optional[LoadoutConfig]]:
+        """
+        The loadout of every drone, from the looks config at its index with the choreography's overrides.
+        Drones without a looks config get None, so they keep the default appearance.
+        """
+        table = self.appearance_table(choreo_class, len(looks_paths))
+        return [None if looks_path is None else self.loadout(looks_path, 0, table.get(index))
+                for index, looks_path in enumerate(looks_paths)]
@@ -0,0 +1,184 @@
+"""
+Records show runs to a binary file and memory-maps them back.
+
+The file is row-oriented: a fixed-width record per tick holding every field, rather than a column per field.
+That keeps appending one tick cheap and lets replay read a whole tick from one place. The cost is that a single field
+over time, e.g. recording['location'][:, 3], is a strided view across all records, so reading it touches every page
+of the file. For repeated analysis of a few fields, copy them out once with np.ascontiguousarray.
+"""
+import ctypes
+import os
+import struct
+import threading
+from queue import Queue
+from typing import Optional
+
+import numpy as np
+
+from rlbot.utils.logging_utils import get_logger
+from rlbot.utils.structures.game_data_struct import GameTickPacket, PlayerInfo, Physics
+
+from choreography.controls import CONTROL_FIELDS
+from choreography.drone import DroneFleet
+from state_set_buffer import StateSetBuffer, PHYSICS_FIELDS
+
+# Every recording starts with a fixed size header: magic, format version and number of cars.
+MAGIC = b'CHOREREC'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+HEADER_SIZE = 64
+
+# Layout of the PlayerInfo fields we record, used to copy them out of the packet in one go.
+RECORDED_CAR_DTYPE = np.dtype({
+    'names': ['location', 'rotation', 'velocity', 'angular_velocity', 'has_wheel_contact', 'boost'],
+    'formats': [('<f4', 3)] * 4 + ['?', '<i4'],
+    'offsets': [PlayerInfo.physics.offset + getattr(Physics, name).offset
+                for name in ('location', 'rotation', 'velocity', 'angular_velocity')] +
+               [PlayerInfo.has_wheel_contact.offset, PlayerInfo.boost.offset],
+    'itemsize': ctypes.sizeof(PlayerInfo)
+})
+
+# Where each flattened state setting key, e.g. ('location', 'x'), goes in a record.
+SET_COLUMNS = {(name, component): (f'set_{name}', column)
+               for name, components in PHYSICS_FIELDS for column, component in enumerate(components)}
+
+
+def record_dtype(num_cars: int) -> np.dtype:
+    """
+    The fixed width record written every tick. Car fields are arrays with one row per car.
+    The set_ fields hold what was state set that tick, NaN where nothing was set.
+    """
+    return np.dtype([
+        ('tick', '<u4'),
+        ('seconds_elapsed', '<f4'),
+        ('location', '<f4', (num_cars, 3)),
+        ('rotation', '<f4', (num_cars, 3)),
+        ('velocity', '<f4', (num_cars, 3)),
+        ('angular_velocity', '<f4', (num_cars, 3)),
+        ('has_wheel_contact', '?', (num_cars,)),
+        ('boost', '<i4', (num_cars,)),
+        ('controls', '<f4', (num_cars, len(CONTROL_FIELDS))),
+        ('set_location', '<f4', (num_cars, 3)),
+        ('set_rotation', '<f4', (num_cars, 3)),
+        ('set_velocity', '<f4', (num_cars, 3)),
+        ('set_angular_velocity', '<f4', (num_cars, 3)),
+    ])
+
+
+class Recorder:
+    """
+    Records every tick of a show to a binary file: the cars' physics, wheel contact and boost from the packet,
+    the controls we sent and what we state set.
+
+    Records are filled into preallocated blocks, and full blocks are written to disk by a background thread,
+    so the game loop never waits on the disk. The number of cars is fixed by the first tick that has any.
+    Read the file back with load_recording.
+    """
+
+    def __init__(self, path: str, block_size: int = 120):
+        self.logger = get_logger('Recorder')
+        self.path = path
+        self.block_size = block_size
+        self.num_cars: Optional[int] = None
+        self.dtype: Optional[np.dtype] = None
+        self.ticks = 0
+
+        self.block: Optional[np.ndarray] = None
+        self.filled = 0
+        self.free_blocks = Queue()
+        self.full_blocks = Queue()
+        self.writer: Optional[threading.Thread] = None
+
+    def start(self, num_cars: int):
+        self.num_cars = num_cars
+        self.dtype = record_dtype(num_cars)
+        self.block = np.zeros(self.block_size, dtype=self.dtype)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        file = open(self.path, 'wb')
+        file.write(HEADER.pack(MAGIC, VERSION, num_cars).ljust(HEADER_SIZE, b'\0'))
+        self.writer = threading.Thread(target=self.write_blocks, args=(file,), daemon=True)
+        self.writer.start()
+        self.logger.info(f'Recording {num_cars} cars to {self.path}.')
+
+    def record(self, packet: GameTickPacket, fleet: DroneFleet, state_buffer: StateSetBuffer = None):
+        """Records this tick. Call after the inputs and state setting have been sent."""
+        if self.num_cars is None:
+            if packet.num_cars == 0:
+                return
+            self.start(packet.num_cars)
+
+        record = self.block[self.filled]
+        record['tick'] = self.ticks
+        record['seconds_elapsed'] = packet.game_info.seconds_elapsed
+
+        n = min(self.num_cars, packet.num_cars)
+        cars = np.frombuffer(packet.game_cars, dtype=RECORDED_CAR_DTYPE)[:n]
+        for name in RECORDED_CAR_DTYPE.names:
+            record[name][:n] = cars[name]
+
+        n = min(self.num_cars, fleet.size)
+        record['controls'][:n] = fleet.controls[:n]
+
+        for name, _ in PHYSICS_FIELDS:
+            record[f'set_{name}'].fill(np.nan)
+        if state_buffer is not None:
+            # After a flush, previous_cars holds everything requested during this tick.
+            for index, fields in state_buffer.previous_cars.items():
+                if index >= self.num_cars:
+                    continue
+                for key, value in fields.items():
+                    if key in SET_COLUMNS:
+                        name, column = SET_COLUMNS[key]
+                        record[name][index, column] = value
+
+        self.ticks += 1
+        self.filled += 1
+        if self.filled == self.block_size:
+            self.hand_over()
+
+    def hand_over(self):
+        """Passes the current block to the writer thread and carries on in a free one."""
+        self.full_blocks.put((self.block, self.filled))
+        # Never waits for the writer, if no block is free a new one is made.
+        self.block = self.free_blocks.get() if not self.free_blocks.empty() else np.zeros_like(self.block)
+        self.filled = 0
+
+    def write_blocks(self, file):
+        with file:
+            while True:
+                block, filled = self.full_blocks.get()
+                if block is None:
+                    break
+                file.write(block[:filled].tobytes())
+                self.free_blocks.put(block)
+
+    def close(self):
+        """Writes out what is left and waits for the writer to finish."""
+        if self.writer is None:
+            return
+        if self.filled:
+            self.hand_over()
+        self.full_blocks.put((None, 0))
+        self.writer.join()
+        self.writer = None
+        self.logger.info(f'Recorded {self.ticks} ticks to {self.path}.')
+
+
+def load_recording(path: str) -> np.ndarray:
+    """
+    Memory-maps a recording made by Recorder. Returns one record per tick, e.g. recording['location'][:, 3]
+    is the location of car 3 over time. A record cut off at the end of the file is left out.
+    """
+    with open(path, 'rb') as file:
+        magic, version, num_cars = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a recording.')
+    if version != VERSION:
+        raise ValueError(f'{path} is a version {version} recording, expected version {VERSION}.')
+
+    dtype = record_dtype(num_cars)
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
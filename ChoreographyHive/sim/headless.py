@@ -0,0 +1,94 @@
+"""Headless RLBotChoreography
+
+Runs a choreography against the SimGameInterface, without Rocket League. Run it from the
+ChoreographyHive folder with `python -m sim.headless`.
+
+Usage:
+    headless <choreography> [--bots=<bots>] [--ticks=<ticks>] [--tick-rate=<rate>] [--profile=<file>]
+              [--record=<file>]
+    headless (-h | --help)
+
+Options:
+    -h --help           Shows this help message.
+    --bots=<bots>       Number of cars to simulate. Defaults to what the choreography asks for, or 10.
+    --ticks=<ticks>     Number of ticks to run [default: 1200].
+    --tick-rate=<rate>  Simulated ticks per second [default: 120].
+    --profile=<file>    Times every tick and writes the profiler summary to this file.
+    --record=<file>     Records every tick to this file, see recorder.py.
+"""
+import time
+from queue import Queue
+
+from docopt import docopt
+from rlbot.utils.structures.game_data_struct import GameTickPacket
+
+from choreo_index import ChoreoIndex
+from hivemind import Hivemind
+from recorder import Recorder
+from sim.sim_game_interface import SimGameInterface
+from tick_profiler import TickProfiler
+
+
+def find_choreography(name: str):
+    """
+    Looks through the choreos package for a Choreography subclass with the given name, or module.Name
+    if several modules define one with that name. Only imports the module it is in.
+    """
+    index = ChoreoIndex()
+    if name not in index.refresh():
+        raise ValueError(f'Choreography {name} not found.')
+    return index.load(name)
+
+
+def run_headless(choreo_obj, num_cars: int, ticks: int, tick_rate: float = 120.0,
+                 profiler: TickProfiler = None, recorder: Recorder = None) -> Hivemind:
+    """
+    Runs the choreography for the given number of ticks and returns the hivemind for inspection.
+    """
+    game_interface = SimGameInterface(num_cars, tick_rate)
+    hivemind = Hivemind(Queue(), choreo_obj, game_interface, profiler=profiler, recorder=recorder)
+    game_interface.load_interface()
+
+    packet = GameTickPacket()
+    for _ in range(ticks):
+        read_start = time.perf_counter()
+        game_interface.update_live_data_packet(packet)
+        hivemind.tick(packet, time.perf_counter() - read_start)
+    if recorder is not None:
+        recorder.close()
+    return hivemind
+
+
+def main():
+    arguments = docopt(__doc__)
+    choreo_obj = find_choreography(arguments['<choreography>'])
+
+    if arguments['--bots'] is not None:
+        num_cars = int(arguments['--bots'])
+    else:
+        try:
+            num_cars = choreo_obj.get_num_bots()
+        except NotImplementedError:
+            num_cars = 10
+
+    ticks = int(arguments['--ticks'])
+    tick_rate = float(arguments['--tick-rate'])
+    profiler = None
+    if arguments['--profile'] is not None:
+        profiler = TickProfiler(arguments['--profile'], tick_rate=tick_rate)
+    recorder = None
+    if arguments['--record'] is not None:
+        recorder = Recorder(arguments['--record'])
+
+    start = time.perf_counter()
+    run_headless(choreo_obj, num_cars, ticks, tick_rate, profiler, recorder)
+    duration = time.perf_counter() - start
+
+    if profiler is not None:
+        profiler.log_summary()
+        profiler.dump()
+    print(f'[Headless]: Ran {ticks} ticks with {num_cars} cars in {duration:.2f}s ({ticks / duration:.0f} ticks/s).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+import ctypes
+from typing import Optional, List
+
+import numpy as np
+
+from rlbot.utils.game_state_util import GameState, Physics
+from rlbot.utils.structures.bot_input_struct import PlayerInput
+from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket, PlayerInfo, \
+    Physics as PhysicsStruct
+
+from choreography.drone import orient_matrices
+from input_batch import INPUT_DTYPE
+
+# Some useful game values: https://github.com/RLBot/RLBot/wiki/Useful-Game-Values
+GRAVITY = -650.0
+CAR_REST_Z = 17.0
+BALL_RADIUS = 92.75
+SIDE_WALL = 4096.0
+BACK_WALL = 5120.0
+CEILING = 2044.0
+MAX_CAR_SPEED = 2300.0
+MAX_THROTTLE_SPEED = 1410.0
+THROTTLE_ACCEL = 1600.0
+BRAKE_ACCEL = 3500.0
+COAST_ACCEL = 525.0
+BOOST_ACCEL = 991.666
+JUMP_SPEED = 292.0
+AIR_ROTATION_SPEED = 5.5
+BALL_RESTITUTION = 0.6
+
+# Turning curvature (1/turning radius) at a few speeds, interpolated in between.
+CURVATURE_SPEEDS = [0.0, 500.0, 1000.0, 1500.0, 1750.0, 2300.0]
+CURVATURES = [0.0069, 0.00398, 0.00235, 0.001375, 0.0011, 0.00088]
+
+# Layout of the fields we write into PlayerInfo, used to fill game_cars without looping over cars.
+SIM_CAR_DTYPE = np.dtype({
+    'names': ['location', 'rotation', 'velocity', 'angular_velocity', 'has_wheel_contact', 'jumped', 'boost'],
+    'formats': [('<f4', 3), ('<f4', 3), ('<f4', 3), ('<f4', 3), '?', '?', '<i4'],
+    'offsets': [
+        PlayerInfo.physics.offset + PhysicsStruct.location.offset,
+        PlayerInfo.physics.offset + PhysicsStruct.rotation.offset,
+        PlayerInfo.physics.offset + PhysicsStruct.velocity.offset,
+        PlayerInfo.physics.offset + PhysicsStruct.angular_velocity.offset,
+        PlayerInfo.has_wheel_contact.offset,
+        PlayerInfo.jumped.offset,
+        PlayerInfo.boost.offset
+    ],
+    'itemsize': ctypes.sizeof(PlayerInfo)
+})
+
+
+class SimGameInterface:
+    """
+    A stand-in for rlbot's GameInterface which runs without Rocket League.
+
+    Cars follow a simple fixed-step kinematic model: they drive along their heading on the ground,
+    fly ballistically with boost and simple rotation controls in the air, and are kept inside the arena.
+    Every call to update_live_data_packet advances the simulation by exactly one tick, so runs are
+    deterministic and go as fast as the choreography allows.
+    """
+
+    def __init__(self, num_cars: int, tick_rate: float = 120.0, team: int = 0):
+        self.num_cars = num_cars
+        self.dt = 1.0 / tick_rate
+        self.team = team
+        self.gravity = GRAVITY
+        self.loaded = False
+        self.frame_num = 0
+        self.seconds_elapsed = 0.0
+
+        # Car state.
+        # Lined up 200 apart along y, in several rows if they don't fit between the back walls.
+        per_row = int(2 * (BACK_WALL - 200) // 200)
+        rows = max(1, -(-num_cars // per_row))
+        index = np.arange(num_cars)
+        row, column = index // per_row, index % per_row
+        row_length = np.minimum(per_row, num_cars - row * per_row)
+        self.pos = np.zeros((num_cars, 3))
+        self.pos[:, 0] = row * 200 - (rows - 1) * 100
+        self.pos[:, 1] = (column - row_length / 2) * 200
+        self.pos[:, 2] = CAR_REST_Z
+        self.rot = np.zeros((num_cars, 3))
+        self.vel = np.zeros((num_cars, 3))
+        self.ang_vel = np.zeros((num_cars, 3))
+        self.boost = np.full(num_cars, 100.0)
+        self.on_ground = np.ones(num_cars, dtype=bool)
+        self.jumped = np.zeros(num_cars, dtype=bool)
+        self.orient = orient_matrices(self.rot)
+
+        # Last input received for every car.
+        self.throttle = np.zeros(num_cars)
+        self.steer = np.zeros(num_cars)
+        self.pitch = np.zeros(num_cars)
+        self.yaw = np.zeros(num_cars)
+        self.roll = np.zeros(num_cars)
+        self.jump = np.zeros(num_cars, dtype=bool)
+        self.boosting = np.zeros(num_cars, dtype=bool)
+        self.handbrake = np.zeros(num_cars, dtype=bool)
+        self.prev_jump = np.zeros(num_cars, dtype=bool)
+
+        # Ball state.
+        self.ball_pos = np.array([0.0, 0.0, BALL_RADIUS])
+        self.ball_vel = np.zeros(3)
+        self.ball_ang_vel = np.zeros(3)
+
+        self._packet = None
+        self._cars = None
+
+    def load_interface(self, *args, **kwargs):
+        self.loaded = True
+
+    def update_field_info_packet(self, field_info_packet: FieldInfoPacket):
+        field_info_packet.num_boosts = 0
+        field_info_packet.num_goals = 0
+
+    def update_live_data_packet(self, game_tick_packet: GameTickPacket):
+        """Advances the simulation by one tick and writes the result into the packet."""
+        self.advance()
+        self.write_packet(game_tick_packet)
+
+    def fresh_live_data_packet(self, game_tick_packet: GameTickPacket, timeout_millis: int, key: int):
+        self.update_live_data_packet(game_tick_packet)
+
+    def update_player_input(self, player_input: PlayerInput, index: int):
+        if index >= self.num_cars:
+            return
+        self.throttle[index] = player_input.throttle
+        self.steer[index] = player_input.steer
+        self.pitch[index] = player_input.pitch
+        self.yaw[index] = player_input.yaw
+        self.roll[index] = player_input.roll
+        self.jump[index] = player_input.jump
+        self.boosting[index] = player_input.boost
+        self.handbrake[index] = player_input.handbrake
+
+    def update_player_inputs(self, player_inputs, indices: List[int]):
+        """Takes the inputs of many cars at once, player_inputs is a ctypes array of PlayerInput."""
+        indices = np.asarray(indices, dtype=int)
+        indices = indices[indices < self.num_cars]
+        inputs = np.frombuffer(player_inputs, dtype=INPUT_DTYPE)[indices]
+        self.throttle[indices] = inputs['throttle']
+        self.steer[indices] = inputs['steer']
+        self.pitch[indices] = inputs['pitch']
+        self.yaw[indices] = inputs['yaw']
+        self.roll[indices] = inputs['roll']
+        self.jump[indices] = inputs['jump']
+        self.boosting[indices] = inputs['boost']
+        self.handbrake[indices] = inputs['handbrake']
+
+    def set_game_state(self, game_state: GameState):
+        if game_state.cars:
+            for index, car_state in game_state.cars.items():
+                if index >= self.num_cars:
+                    continue
+                if car_state.physics is not None:
+                    self._set_physics(car_state.physics, self.pos[index], self.rot[index],
+                                      self.vel[index], self.ang_vel[index])
+                    if car_state.physics.location is not None and car_state.physics.location.z is not None:
+                        self.on_ground[index] = self.pos[index, 2] <= CAR_REST_Z
+                if car_state.boost_amount is not None:
+                    self.boost[index] = car_state.boost_amount
+                if car_state.jumped is not None:
+                    self.jumped[index] = car_state.jumped
+            orient_matrices(self.rot, out=self.orient)
+
+        if game_state.ball is not None and game_state.ball.physics is not None:
+            self._set_physics(game_state.ball.physics, self.ball_pos, None, self.ball_vel, self.ball_ang_vel)
+
+        if game_state.game_info is not None and game_state.game_info.world_gravity_z is not None:
+            self.gravity = game_state.game_info.world_gravity_z
+
+    def advance(self):
+        """Steps every car and the ball forward by one tick."""
+        dt = self.dt
+        ground = self.on_ground
+        air = ~ground
+
+        # Jumping only happens on the rising edge of the jump button.
+        jump_pressed = self.jump & ~self.prev_jump
+        self.prev_jump[:] = self.jump
+        take_off = ground & jump_pressed
+        self.vel[take_off] += JUMP_SPEED * self.orient[take_off, :, 2]
+        self.jumped[take_off] = True
+
+        # Ground driving along the heading.
+        forward = self.orient[:, :, 0]
+        speed = np.einsum('ij,ij->i', self.vel, forward)
+        accel = np.where(speed * self.throttle < 0, BRAKE_ACCEL * np.sign(self.throttle),
+                         THROTTLE_ACCEL * self.throttle * np.clip(1 - np.abs(speed) / MAX_THROTTLE_SPEED, 0, 1))
+        coasting = self.throttle == 0
+        accel[coasting] = -np.sign(speed[coasting]) * np.minimum(COAST_ACCEL, np.abs(speed[coasting]) / dt)
+        accel += np.where(self.boosting & (self.boost > 0), BOOST_ACCEL, 0.0)
+        new_speed = np.clip(speed + accel * dt, -MAX_CAR_SPEED, MAX_CAR_SPEED)
+
+        curvature = np.interp(np.abs(new_speed), CURVATURE_SPEEDS, CURVATURES)
+        turn = np.where(self.handbrake, 1.5, 1.0) * self.steer * curvature * new_speed
+        driving = ground & ~take_off
+        self.rot[driving, 1] += turn[driving] * dt
+        self.rot[driving, 0] = 0.0
+        self.rot[driving, 2] = 0.0
+
+        # Airborne cars fall, boost along their nose and rotate with pitch, yaw and roll.
+        self.vel[air, 2] += self.gravity * dt
+        air_boost = air & self.boosting & (self.boost > 0)
+        self.vel[air_boost] += BOOST_ACCEL * dt * forward[air_boost]
+        self.ang_vel[air] = AIR_ROTATION_SPEED * np.stack(
+            (self.pitch[air], self.yaw[air], self.roll[air]), axis=1)
+        self.ang_vel[ground] = 0.0
+        self.rot[air] += self.ang_vel[air] * dt
+
+        orient_matrices(self.rot, out=self.orient)
+        self.vel[driving] = new_speed[driving, np.newaxis] * self.orient[driving, :, 0]
+        speeds = np.linalg.norm(self.vel, axis=1)
+        too_fast = speeds > MAX_CAR_SPEED
+        self.vel[too_fast] *= (MAX_CAR_SPEED / speeds[too_fast])[:, np.newaxis]
+        self.pos += self.vel * dt
+
+        # Keeps cars inside the arena. Landing puts them back on their wheels.
+        landed = air & (self.pos[:, 2] <= CAR_REST_Z) & (self.vel[:, 2] <= 0)
+        self.pos[:, 2] = np.maximum(self.pos[:, 2], CAR_REST_Z)
+        self.vel[landed, 2] = 0.0
+        self.rot[landed, 0] = 0.0
+        self.rot[landed, 2] = 0.0
+        self.on_ground = (ground & ~take_off) | landed
+        self.jumped[landed] = False
+        self._keep_inside(self.pos, self.vel, CAR_REST_Z)
+        orient_matrices(self.rot, out=self.orient)
+
+        # The ball only falls and bounces.
+        self.ball_vel[2] += self.gravity * dt
+        self.ball_pos += self.ball_vel * dt
+        if self.ball_pos[2] < BALL_RADIUS:
+            self.ball_pos[2] = BALL_RADIUS
+            self.ball_vel[2] = -self.ball_vel[2] * BALL_RESTITUTION
+
+        self.frame_num += 1
+        self.seconds_elapsed = self.frame_num * self.dt
+
+    def write_packet(self, packet: GameTickPacket):
+        if packet is not self._packet:
+            self._cars = np.frombuffer(packet.game_cars, dtype=SIM_CAR_DTYPE)[:self.num_cars]
+            self._packet = packet
+            for index in range(self.num_cars):
+                packet.game_cars[index].team = self.team
+                packet.game_cars[index].is_bot = True
+                packet.game_cars[index].name = f'Drone {index}'
+
+        cars = self._cars
+        cars['location'] = self.pos
+        cars['rotation'] = self.rot
+        cars['velocity'] = self.vel
+        cars['angular_velocity'] = self.ang_vel
+        cars['has_wheel_contact'] = self.on_ground
+        cars['jumped'] = self.jumped
+        cars['boost'] = self.boost
+
+        packet.num_cars = self.num_cars
+        packet.game_info.seconds_elapsed = self.seconds_elapsed
+        packet.game_info.frame_num = self.frame_num
+        packet.game_info.is_round_active = True
+        packet.game_info.is_unlimited_time = True
+        packet.game_info.world_gravity_z = self.gravity
+        packet.game_info.game_speed = 1.0
+
+        ball = packet.game_ball.physics
+        ball.location.x, ball.location.y, ball.location.z = self.ball_pos
+        ball.velocity.x, ball.velocity.y, ball.velocity.z = self.ball_vel
+        ball.angular_velocity.x, ball.angular_velocity.y, ball.angular_velocity.z = self.ball_ang_vel
+
+    @staticmethod
+    def _set_physics(physics: Physics, pos: np.ndarray, rot: Optional[np.ndarray],
+                     vel: np.ndarray, ang_vel: np.ndarray):
+        """Copies the non-None components of a state setting Physics object into the given arrays."""
+        for vector, target in ((physics.location, pos), (physics.velocity, vel),
+                               (physics.angular_velocity, ang_vel)):
+            if vector is not None:
+                for axis, value in enumerate((vector.x, vector.y, vector.z)):
+                    if value is not None:
+                        target[axis] = value
+        if rot is not None and physics.rotation is not None:
+            for axis, value in enumerate((physics.rotation.pitch, physics.rotation.yaw, physics.rotation.roll)):
+                if value is not None:
+                    rot[axis] = value
+
+    @staticmethod
+    def _keep_inside(pos: np.ndarray, vel: np.ndarray, floor: float):
+        bounds = np.array([SIDE_WALL, BACK_WALL, CEILING])
+        outside_low = pos < -bounds
+        outside_low[:, 2] = False
+        outside_high = pos > bounds
+        pos[:] = np.clip(pos, -bounds, bounds)
+        pos[:, 2] = np.maximum(pos[:, 2], floor)
+        vel[outside_low | outside_high] = 0.0
@@ -0,0 +1,173 @@
+import math
+from typing import Dict, Optional
+
+from rlbot.utils.game_state_util import GameState, CarState, BallState, Physics, Vector3, Rotator, \
+    GameInfoState, BoostState
+from rlbot.utils.structures.game_data_struct import GameTickPacket
+
+# The components of a Physics object, in the order they are stored.
+PHYSICS_FIELDS = (
+    ('location', ('x', 'y', 'z')),
+    ('rotation', ('pitch', 'yaw', 'roll')),
+    ('velocity', ('x', 'y', 'z')),
+    ('angular_velocity', ('x', 'y', 'z'))
+)
+CAR_FIELDS = ('boost_amount', 'jumped', 'double_jumped')
+GAME_INFO_FIELDS = ('world_gravity_z', 'game_speed', 'paused', 'end_match')
+
+# How far the game may be from a value we set before we send that value again.
+TOLERANCES = {
+    'location': 0.5,
+    'rotation': 0.001,
+    'velocity': 0.5,
+    'angular_velocity': 0.001,
+    'boost_amount': 1.0
+}
+
+
+class StateSetBuffer:
+    """
+    Collects all the state setting done during a tick and sends it to the game as one GameState.
+
+    It stands in for the game interface: set_game_state only records the request, and everything
+    else is passed through to the real interface. Requests for the same car are merged field by field,
+    later requests winning. With dedupe on, fields which have the same value as in the previous tick's
+    flush are dropped, as long as the packet shows the game still holds that value.
+    """
+
+    def __init__(self, game_interface, dedupe: bool = True):
+        self.game_interface = game_interface
+        self.dedupe = dedupe
+
+        # Pending requests, every field is flattened to a key like ('location', 'x').
+        self.cars: Dict[int, dict] = {}
+        self.ball: dict = {}
+        self.boosts: Dict[int, float] = {}
+        self.game_info: dict = {}
+        self.console_commands = []
+
+        # What was requested in the previous flush.
+        self.previous_cars: Dict[int, dict] = {}
+        self.previous_ball: dict = {}
+
+    def __getattr__(self, name):
+        # Everything except set_game_state goes straight to the real game interface.
+        return getattr(self.game_interface, name)
+
+    def set_game_state(self, game_state: GameState):
+        if game_state.cars:
+            for index, car_state in game_state.cars.items():
+                fields = self.cars.setdefault(index, {})
+                if car_state.physics is not None:
+                    flatten_physics(car_state.physics, fields)
+                for name in CAR_FIELDS:
+                    value = getattr(car_state, name)
+                    if value is not None:
+                        fields[name] = value
+
+        if game_state.ball is not None and game_state.ball.physics is not None:
+            flatten_physics(game_state.ball.physics, self.ball)
+
+        if game_state.boosts:
+            for index, boost_state in game_state.boosts.items():
+                if boost_state.respawn_time is not None:
+                    self.boosts[index] = boost_state.respawn_time
+
+        if game_state.game_info is not None:
+            for name in GAME_INFO_FIELDS:
+                value = getattr(game_state.game_info, name)
+                if value is not None:
+                    self.game_info[name] = value
+
+        if game_state.console_commands:
+            self.console_commands.extend(game_state.console_commands)
+
+    def flush(self, packet: Optional[GameTickPacket] = None):
+        """
+        Sends everything requested since the last flush. Call once per tick.
+        The packet is used to check that deduped values still hold in game.
+        """
+        car_states = {}
+        for index, fields in self.cars.items():
+            if self.dedupe:
+                game_car = None if packet is None else packet.game_cars[index]
+                fields = self._changed(fields, self.previous_cars.get(index, {}), game_car)
+            if fields:
+                car_states[index] = build_car_state(fields)
+
+        ball_state = None
+        ball = self.ball
+        if self.dedupe and ball:
+            ball = self._changed(ball, self.previous_ball, None if packet is None else packet.game_ball)
+        if ball:
+            ball_state = BallState(physics=build_physics(ball))
+
+        boost_states = {index: BoostState(respawn_time) for index, respawn_time in self.boosts.items()}
+        game_info_state = GameInfoState(**self.game_info) if self.game_info else None
+
+        if car_states or ball_state or boost_states or game_info_state or self.console_commands:
+            self.game_interface.set_game_state(GameState(
+                ball=ball_state,
+                cars=car_states or None,
+                boosts=boost_states or None,
+                game_info=game_info_state,
+                console_commands=self.console_commands))
+
+        # Only consecutive ticks are deduped, so a tick without requests resets this.
+        self.previous_cars = self.cars
+        self.previous_ball = self.ball
+        self.cars = {}
+        self.ball = {}
+        self.boosts = {}
+        self.game_info = {}
+        self.console_commands = []
+
+    @staticmethod
+    def _changed(fields: dict, previous: dict, game_object) -> dict:
+        """Drops fields which were flushed last time with the same value, if the game still agrees."""
+        changed = {}
+        for key, value in fields.items():
+            if previous.get(key) != value or (game_object is not None and not still_holds(game_object, key, value)):
+                changed[key] = value
+        return changed
+
+
+def flatten_physics(physics: Physics, fields: dict):
+    """Copies the non-None components of a Physics object into fields, keyed like ('location', 'x')."""
+    for name, components in PHYSICS_FIELDS:
+        vector = getattr(physics, name)
+        if vector is not None:
+            for component in components:
+                value = getattr(vector, component)
+                if value is not None:
+                    fields[(name, component)] = value
+
+
+def build_physics(fields: dict) -> Optional[Physics]:
+    vectors = {}
+    for name, components in PHYSICS_FIELDS:
+        values = [fields.get((name, component)) for component in components]
+        if any(value is not None for value in values):
+            vectors[name] = Rotator(*values) if name == 'rotation' else Vector3(*values)
+    return Physics(**vectors) if vectors else None
+
+
+def build_car_state(fields: dict) -> CarState:
+    return CarState(physics=build_physics(fields), **{name: fields[name] for name in CAR_FIELDS if name in fields})
+
+
+def still_holds(game_object, key, value) -> bool:
+    """
+    Checks whether a car or ball in the packet still has the value we previously set for this field.
+    """
+    if key == 'boost_amount':
+        return abs(game_object.boost - value) <= TOLERANCES[key]
+    if key in ('jumped', 'double_jumped'):
+        return getattr(game_object, key) == value
+
+    name, component = key
+    actual = getattr(getattr(game_object.physics, name), component)
+    difference = actual - value
+    if name == 'rotation':
+        difference = (difference + math.pi) % (2 * math.pi) - math.pi
+    return abs(difference) <= TOLERANCES[name]
@@ -0,0 +1,145 @@
+import json
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from rlbot.utils.logging_utils import get_logger
+
+from choreography.group_step import GroupStep
+
+
+class RingBuffer:
+    """
+    Fixed size buffer of durations. Once full, the oldest durations are overwritten.
+    """
+
+    def __init__(self, capacity: int):
+        self.values = np.zeros(capacity)
+        self.count = 0
+
+    def append(self, value: float):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def filled(self) -> np.ndarray:
+        return self.values[:min(self.count, len(self.values))]
+
+    def stats(self) -> Dict[str, float]:
+        """Returns count, mean, p50, p95, p99 and max, with durations in milliseconds."""
+        values = self.filled() * 1000
+        if len(values) == 0:
+            return {'count': 0}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            'count': self.count,
+            'mean': round(float(values.mean()), 4),
+            'p50': round(float(p50), 4),
+            'p95': round(float(p95), 4),
+            'p99': round(float(p99), 4),
+            'max': round(float(values.max()), 4)
+        }
+
+
+class TickProfiler:
+    """
+    Records how long each phase of a Hivemind tick takes, and how long each choreography step takes.
+    The phases are packet (reading the packet), drones (updating the fleet), choreo (stepping the
+    choreography), state_set (sending state setting), inputs (sending player inputs) and total.
+
+    A summary is logged every log_interval seconds and written to dump_path, so runs can be diffed.
+    """
+
+    PHASES = ('packet', 'drones', 'choreo', 'state_set', 'inputs', 'total')
+
+    def __init__(self, dump_path: Optional[str] = None, capacity: int = 4096,
+                 log_interval: float = 10.0, tick_rate: float = 120.0):
+        self.logger = get_logger('Tick Profiler')
+        self.dump_path = dump_path
+        self.capacity = capacity
+        self.log_interval = log_interval
+        self.frame = 1.0 / tick_rate
+
+        self.phases: Dict[str, RingBuffer] = {phase: RingBuffer(capacity) for phase in self.PHASES}
+        self.steps: Dict[str, RingBuffer] = {}
+        self.ticks = 0
+        self.missed_ticks = 0
+
+        self.prev_game_time = None
+        self.tick_start = 0.0
+        self.lap_start = 0.0
+        self.last_log = time.perf_counter()
+
+    def record(self, phase: str, duration: float):
+        self.phases[phase].append(duration)
+
+    def begin_tick(self, game_time: float, packet_duration: float = None):
+        """
+        Call when a new packet arrives. packet_duration is how long reading that packet took.
+        """
+        self.tick_start = self.lap_start = time.perf_counter()
+        if packet_duration is not None:
+            self.record('packet', packet_duration)
+
+        # Counts the frames we skipped over since the previous packet.
+        if self.prev_game_time is not None:
+            frames = round((game_time - self.prev_game_time) / self.frame)
+            if frames > 1:
+                self.missed_ticks += frames - 1
+        self.prev_game_time = game_time
+        self.ticks += 1
+
+    def lap(self, phase: str) -> float:
+        """Records the time since the previous lap (or the start of the tick) as the given phase."""
+        now = time.perf_counter()
+        duration = now - self.lap_start
+        self.record(phase, duration)
+        self.lap_start = now
+        return duration
+
+    def record_step(self, step: GroupStep, duration: float):
+        name = step_label(step)
+        if name not in self.steps:
+            self.steps[name] = RingBuffer(self.capacity)
+        self.steps[name].append(duration)
+
+    def end_tick(self):
+        now = time.perf_counter()
+        self.record('total', now - self.tick_start)
+        if now - self.last_log >= self.log_interval:
+            self.last_log = now
+            self.log_summary()
+            self.dump()
+
+    def summary(self) -> dict:
+        return {
+            'ticks': self.ticks,
+            'missed_ticks': self.missed_ticks,
+            'phases': {phase: buffer.stats() for phase, buffer in self.phases.items()},
+            'steps': {name: buffer.stats() for name, buffer in sorted(self.steps.items())}
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        lines = [f'{summary["ticks"]} ticks, {summary["missed_ticks"]} missed.']
+        for name, stats in list(summary['phases'].items()) + list(summary['steps'].items()):
+            if stats['count']:
+                lines.append(f'{name:<40} p50 {stats["p50"]:>8.3f}ms  p95 {stats["p95"]:>8.3f}ms  '
+                             f'p99 {stats["p99"]:>8.3f}ms  max {stats["max"]:>8.3f}ms')
+        self.logger.info('\n'.join(lines))
+
+    def dump(self):
+        if self.dump_path is None:
+            return
+        with open(self.dump_path, 'w') as file:
+            json.dump(self.summary(), file, indent=2, sort_keys=True)
+
+
+def step_label(step: GroupStep) -> str:
+    """
+    Names a step by its class and the choreo function it runs, e.g. DroneListStep.hide_ball.
+    """
+    fn = getattr(step, 'fn', None) or getattr(step, 'bot_fn', None)
+    if fn is None:
+        return step.__class__.__name__
+    return f'{step.__class__.__name__}.{getattr(fn, "__name__", type(fn).__name__)}'
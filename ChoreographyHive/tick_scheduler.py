@@ -0,0 +1,129 @@
+import time
+
+from rlbot.utils.logging_utils import get_logger
+from rlbot.utils.structures.game_data_struct import GameTickPacket
+
+from tick_profiler import RingBuffer
+
+
+class TickScheduler:
+    """
+    Decides how the Hivemind waits for the next packet. There are three modes:
+
+    poll -- Reads the packet and sleeps for 1ms whenever it has not changed. This is the old behaviour.
+    adaptive -- Predicts when the next packet arrives from the observed tick interval, sleeps until
+        just before that, and then only busy-waits for a short tail. While packets stop coming, e.g. when
+        the game is paused, it polls like poll mode until they come back.
+    fresh -- Blocks on the game interface until it signals that a new packet is ready.
+        Falls back to adaptive if the interface can't do that.
+
+    It also measures the latency from noticing a new packet to having sent the inputs for it.
+    """
+
+    MODES = ('poll', 'adaptive', 'fresh')
+    # Once no packet arrived for this many intervals, e.g. while paused or loading, adaptive polls like poll mode.
+    STALE_INTERVALS = 2
+    # A pause is a single long gap. This many long gaps in a row mean the tick rate really dropped.
+    RATE_CHANGE_GAPS = 8
+
+    def __init__(self, game_interface, mode: str = 'adaptive', spin_margin: float = 0.0015,
+                 fresh_timeout_millis: int = 20, log_interval: float = 30.0):
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown scheduler mode {mode}, expected one of {", ".join(self.MODES)}.')
+        if mode == 'fresh' and not hasattr(game_interface, 'fresh_live_data_packet'):
+            mode = 'adaptive'
+
+        self.logger = get_logger('Tick Scheduler')
+        self.game_interface = game_interface
+        self.mode = mode
+        self.spin_margin = spin_margin
+        self.fresh_timeout_millis = fresh_timeout_millis
+        self.log_interval = log_interval
+
+        # Exponential moving average of the time between packets.
+        self.interval = None
+        self.last_arrival = None
+        self.long_gaps = 0
+        self.read_duration = None
+        self.latencies = RingBuffer(4096)
+        self.last_log = time.perf_counter()
+
+    def next_packet(self, packet: GameTickPacket) -> bool:
+        """
+        Waits for a new packet and writes it into packet. Returns False if no new packet
+        arrived in time, so the caller gets a chance to check for commands before trying again.
+        """
+        prev_time = packet.game_info.seconds_elapsed
+
+        if self.mode == 'fresh':
+            self.game_interface.fresh_live_data_packet(packet, self.fresh_timeout_millis, 0)
+            if prev_time == packet.game_info.seconds_elapsed:
+                return False
+            # The read can't be timed apart from the wait for the packet, so it isn't recorded.
+            self.read_duration = None
+            return self._arrived(time.perf_counter())
+
+        if self.mode == 'adaptive' and self.interval is not None and \
+                time.perf_counter() - self.last_arrival < self.STALE_INTERVALS * self.interval:
+            # Sleeps until just before the predicted arrival.
+            predicted = self.last_arrival + self.interval
+            sleep_time = predicted - self.spin_margin - time.perf_counter()
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+
+            # Busy-waits for the tail, giving up after another interval in case a packet was dropped.
+            deadline = max(predicted, time.perf_counter()) + self.interval
+            while True:
+                read_start = time.perf_counter()
+                self.game_interface.update_live_data_packet(packet)
+                now = time.perf_counter()
+                if prev_time != packet.game_info.seconds_elapsed:
+                    self.read_duration = now - read_start
+                    return self._arrived(now)
+                if now > deadline:
+                    return False
+                time.sleep(0)
+
+        read_start = time.perf_counter()
+        self.game_interface.update_live_data_packet(packet)
+        now = time.perf_counter()
+        if prev_time == packet.game_info.seconds_elapsed:
+            time.sleep(0.001)
+            return False
+        self.read_duration = now - read_start
+        return self._arrived(now)
+
+    def inputs_sent(self):
+        """Call once the inputs for the latest packet have been sent."""
+        now = time.perf_counter()
+        self.latencies.append(now - self.last_arrival)
+        if now - self.last_log >= self.log_interval:
+            self.last_log = now
+            self.log_summary()
+
+    def log_summary(self):
+        stats = self.latencies.stats()
+        if not stats['count']:
+            return
+        interval = 0.0 if self.interval is None else self.interval * 1000
+        self.logger.info(f'{self.mode} mode, tick interval {interval:.3f}ms, packet to input latency '
+                         f'p50 {stats["p50"]:.3f}ms p95 {stats["p95"]:.3f}ms p99 {stats["p99"]:.3f}ms '
+                         f'max {stats["max"]:.3f}ms')
+
+    def _arrived(self, now: float) -> bool:
+        if self.last_arrival is not None:
+            observed = now - self.last_arrival
+            if self.interval is None:
+                self.interval = observed
+            elif observed < self.STALE_INTERVALS * self.interval:
+                self.long_gaps = 0
+                self.interval += 0.1 * (observed - self.interval)
+            else:
+                # Gaps from dropped packets or pauses just resync the next prediction. Counting them in would
+                # make adaptive sleep that much longer, so every later gap would keep the estimate up.
+                self.long_gaps += 1
+                if self.long_gaps >= self.RATE_CHANGE_GAPS:
+                    self.long_gaps = 0
+                    self.interval = observed
+        self.last_arrival = now
+        return True